@@ -0,0 +1,152 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from microgrid_engine import LOAD_POWER_FACTOR
+
+# Per-unit bases: nominal phase voltage and apparent power
+BASE_VOLTAGE = 230.0  # V
+BASE_POWER = 10.0  # kVA
+
+# Largest P/Q mismatch (pu) accepted as converged
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 20
+
+# A reused Jacobian is refactorized once an iteration shrinks the mismatch by less than this
+MIN_CONTRACTION = 0.25
+
+
+class Network:
+    """AC network of buses and R/X lines solved by sparse Newton-Raphson load flow.
+
+    Bus `pcc` (point of common coupling) is the slack bus while grid-connected;
+    islanded, the grid-forming battery inverter at `battery_bus` takes over.
+    PV inverters (at unity power factor) and loads are PQ injections spread
+    over their buses by weight. Each solve starts from the previous voltages and reuses the
+    previous LU factorization of the Jacobian while it keeps converging, so
+    consecutive ticks with small changes cost a few sparse triangular solves.
+    """
+
+    def __init__(self, n_buses, lines, pcc=0, battery_bus=None, pv_buses=(), load_weights=None,
+                 pv_weights=None, monitor_bus=None):
+        # lines: (from_bus, to_bus, r_ohm, x_ohm) arrays
+        self.n_buses = n_buses
+        self.pcc = pcc
+        self.battery_bus = pcc if battery_bus is None else battery_bus
+        self.monitor_bus = self.battery_bus if monitor_bus is None else monitor_bus
+        self.ybus = self._admittance_matrix(n_buses, *lines)
+
+        # Share of the total PV and load at every bus
+        self.pv_weights = np.zeros(n_buses)
+        if len(pv_buses):
+            self.pv_weights[np.asarray(pv_buses)] = 1.0 if pv_weights is None else pv_weights
+            self.pv_weights /= self.pv_weights.sum()
+        self.load_weights = np.ones(n_buses) if load_weights is None else np.asarray(load_weights, dtype=float)
+        self.load_weights = self.load_weights / self.load_weights.sum()
+
+        self.voltage = np.ones(n_buses, dtype=complex)  # Warm start for the next solve
+        self.iterations = 0
+        self.factorizations = 0
+        self._slack = None
+        self._pq = None
+        self._lu = None
+
+    @staticmethod
+    def _admittance_matrix(n_buses, from_bus, to_bus, r_ohm, x_ohm):
+        z_base = BASE_VOLTAGE ** 2 / (BASE_POWER * 1000)
+        y = 1.0 / ((np.asarray(r_ohm) + 1j * np.asarray(x_ohm)) / z_base)
+        rows = np.concatenate((from_bus, to_bus, from_bus, to_bus))
+        cols = np.concatenate((from_bus, to_bus, to_bus, from_bus))
+        return sp.csr_matrix((np.concatenate((y, y, -y, -y)), (rows, cols)), shape=(n_buses, n_buses))
+
+    def injections(self, pv_kw, load_kw, battery_kw=0.0):
+        # Complex power injected at every bus (pu); battery_kw is positive charging
+        load = load_kw * self.load_weights
+        power = pv_kw * self.pv_weights - load - 1j * load * np.tan(np.arccos(LOAD_POWER_FACTOR))
+        power[self.battery_bus] -= battery_kw
+        return power / BASE_POWER
+
+    def _jacobian(self, voltage):
+        # Sparse derivatives of the bus power injections w.r.t. angle and magnitude
+        current = self.ybus @ voltage
+        diag_v = sp.diags(voltage)
+        ds_dangle = 1j * diag_v @ (sp.diags(current) - self.ybus @ diag_v).conj()
+        ds_dmagnitude = diag_v @ (self.ybus @ sp.diags(voltage / np.abs(voltage))).conj() \
+            + sp.diags(current).conj() @ sp.diags(voltage / np.abs(voltage))
+        pq = self._pq
+        ds_dangle = ds_dangle.tocsr()[pq][:, pq]
+        ds_dmagnitude = ds_dmagnitude.tocsr()[pq][:, pq]
+        return sp.bmat([
+            [ds_dangle.real, ds_dmagnitude.real],
+            [ds_dangle.imag, ds_dmagnitude.imag],
+        ], format='csc')
+
+    def solve(self, power, islanded=False):
+        # Bus voltages (pu) for the injections `power` (pu); the slack bus absorbs the balance
+        slack = self.battery_bus if islanded else self.pcc
+        if slack != self._slack:
+            self._slack = slack
+            self._pq = np.flatnonzero(np.arange(self.n_buses) != slack)
+            self._lu = None
+        pq = self._pq
+        n_pq = len(pq)
+
+        voltage = self.voltage.copy()
+        voltage[slack] = 1.0
+        previous = None
+        for iteration in range(MAX_ITERATIONS):
+            mismatch = voltage * (self.ybus @ voltage).conj() - power
+            residual = np.concatenate((mismatch.real[pq], mismatch.imag[pq]))
+            norm = np.abs(residual).max()
+            if norm < TOLERANCE:
+                self.voltage = voltage
+                self.iterations = iteration
+                return voltage
+            if self._lu is None or (previous is not None and norm > MIN_CONTRACTION * previous):
+                self._lu = splu(self._jacobian(voltage))
+                self.factorizations += 1
+            step = self._lu.solve(residual)
+            angle = np.angle(voltage)
+            magnitude = np.abs(voltage)
+            angle[pq] -= step[:n_pq]
+            magnitude[pq] -= step[n_pq:]
+            voltage = magnitude * np.exp(1j * angle)
+            previous = norm
+
+        # Start the next solve from a flat profile and a fresh Jacobian
+        self.voltage = np.ones(self.n_buses, dtype=complex)
+        self._lu = None
+        raise RuntimeError(f"power flow did not converge in {MAX_ITERATIONS} iterations (mismatch {norm:.2e} pu)")
+
+    def slack_power(self):
+        # Complex power (kVA) the slack bus injects at the last solution
+        slack = self._slack
+        return self.voltage[slack] * (self.ybus[slack] @ self.voltage).conj().item() * BASE_POWER
+
+    def losses(self):
+        # Active power (kW) lost in the lines at the last solution
+        return float((self.voltage * (self.ybus @ self.voltage).conj()).real.sum() * BASE_POWER)
+
+    def bus_voltages(self):
+        return np.abs(self.voltage) * BASE_VOLTAGE
+
+
+def radial_feeder(n_buses=200, pv_share=0.3, r_ohm=(0.005, 0.02), x_over_r=0.4, seed=0):
+    # Random radial feeder fed from the PCC at bus 0: each bus hangs off one of
+    # the five buses before it, PV sits on `pv_share` of the buses, the battery
+    # inverter halfway down and the monitored voltage is the feeder end's
+    rng = np.random.default_rng(seed)
+    to_bus = np.arange(1, n_buses)
+    from_bus = np.array([rng.integers(max(0, bus - 5), bus) for bus in to_bus])
+    r = rng.uniform(*r_ohm, n_buses - 1)
+    pv_buses = rng.choice(to_bus, size=max(1, int(pv_share * n_buses)), replace=False)
+    load_weights = np.concatenate(([0.0], rng.uniform(0.5, 1.5, n_buses - 1)))
+    return Network(
+        n_buses, (from_bus, to_bus, r, r * x_over_r),
+        pcc=0,
+        battery_bus=n_buses // 2,
+        pv_buses=pv_buses,
+        load_weights=load_weights,
+        pv_weights=rng.uniform(0.5, 1.5, len(pv_buses)),
+        monitor_bus=n_buses - 1
+    )
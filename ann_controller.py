@@ -0,0 +1,190 @@
+"""Secondary controller as a small multilayer perceptron in pure NumPy.
+
+The network maps a window of recent (frequency, voltage) errors to correction
+rates in Hz/s and V/s. Inference takes any leading batch shape, so a whole
+fleet, or a whole recorded trajectory of one, is evaluated in one matrix
+multiply per layer.
+
+The shipped weights are distilled from the original proportional rule,
+dead band included: a quarter of the training windows end near its edges,
+where the rule jumps from nothing to its full gain. More than a tenth of the
+dead band away from an edge the network stays within an eighth of that jump
+of the rule; the jump itself is smoothed over that margin. Retrain them with
+
+    python ann_controller.py --samples 200000 --epochs 300 --output models/secondary_mlp.npz
+"""
+import argparse
+import os
+
+import numpy as np
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'secondary_mlp.npz')
+
+# Error samples the network sees per decision, oldest first
+WINDOW = 8
+HIDDEN = (32, 32)
+
+# Typical error magnitudes (Hz, V); inputs are divided by these before the first layer
+ERROR_SCALE = np.array([0.5, 10.0])
+
+# Proportional rule the shipped weights imitate: correct 20% of the error per
+# second once it leaves the dead band
+TEACHER_GAIN = 0.2
+TEACHER_DEADBAND = np.array([0.2, 5.0])
+
+# Share of training windows whose latest error lies within 20% of a dead-band edge
+EDGE_FRACTION = 0.25
+
+
+class MLPController:
+    """tanh MLP from an error window of shape (..., window, 2) to correction rates (..., 2).
+
+    Channel order is (frequency, voltage) everywhere. The `.npz` file holds
+    `W0, b0, W1, b1, ...` plus `input_scale` and `output_scale`.
+    """
+
+    __slots__ = ('weights', 'biases', 'window', 'input_scale', 'output_scale')
+
+    def __init__(self, weights, biases, input_scale=ERROR_SCALE, output_scale=TEACHER_GAIN * ERROR_SCALE):
+        self.weights = [np.asarray(w, dtype=float) for w in weights]
+        self.biases = [np.asarray(b, dtype=float) for b in biases]
+        if self.weights[0].shape[0] % 2 or self.weights[-1].shape[1] != 2:
+            raise ValueError("network must map (window, 2) errors to 2 outputs")
+        self.window = self.weights[0].shape[0] // 2
+        self.input_scale = np.asarray(input_scale, dtype=float)
+        self.output_scale = np.asarray(output_scale, dtype=float)
+
+    @classmethod
+    def random(cls, window=WINDOW, hidden=HIDDEN, seed=None):
+        # Glorot-initialized network, the starting point for training
+        rng = np.random.default_rng(seed)
+        sizes = (2 * window,) + tuple(hidden) + (2,)
+        weights = [rng.normal(0.0, np.sqrt(2.0 / (n_in + n_out)), (n_in, n_out))
+                   for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+        return cls(weights, [np.zeros(n) for n in sizes[1:]])
+
+    @classmethod
+    def load(cls, path=WEIGHTS_PATH):
+        with np.load(path) as data:
+            layers = sum(1 for name in data.files if name.startswith('W'))
+            return cls(
+                [data[f'W{i}'] for i in range(layers)],
+                [data[f'b{i}'] for i in range(layers)],
+                data['input_scale'],
+                data['output_scale']
+            )
+
+    def save(self, path):
+        arrays = {f'W{i}': w for i, w in enumerate(self.weights)}
+        arrays.update({f'b{i}': b for i, b in enumerate(self.biases)})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, input_scale=self.input_scale, output_scale=self.output_scale, **arrays)
+
+    def _forward(self, x):
+        # x: (batch, 2 * window) normalized inputs; returns every layer's activation
+        activations = [x]
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            activations.append(np.tanh(activations[-1] @ w + b))
+        activations.append(activations[-1] @ self.weights[-1] + self.biases[-1])
+        return activations
+
+    def __call__(self, errors):
+        errors = np.asarray(errors, dtype=float)
+        batch_shape = errors.shape[:-2]
+        x = (errors / self.input_scale).reshape(-1, 2 * self.window)
+        return (self._forward(x)[-1] * self.output_scale).reshape(batch_shape + (2,))
+
+    def new_window(self, batch_shape=()):
+        return np.zeros(tuple(batch_shape) + (self.window, 2))
+
+    def correct(self, window, errors, dt):
+        # Pushes the latest errors (..., 2) into `window` in place and returns the
+        # corrections to subtract over dt, never larger than the errors themselves
+        window[..., :-1, :] = window[..., 1:, :]
+        window[..., -1, :] = errors
+        limit = np.abs(window[..., -1, :])
+        return np.clip(self(window) * dt, -limit, limit)
+
+    def evaluate(self, errors):
+        # Correction rates at every step of an error trajectory (T, ..., 2) that
+        # has a full window behind it: (T - window + 1, ..., 2) in one pass
+        windows = np.lib.stride_tricks.sliding_window_view(np.asarray(errors, dtype=float), self.window, axis=0)
+        return self(np.moveaxis(windows, -1, -2))
+
+
+def teacher_rates(errors):
+    # Correction rates of the original proportional rule for the latest errors
+    latest = errors[..., -1, :]
+    return np.where(np.abs(latest) > TEACHER_DEADBAND, TEACHER_GAIN * latest, 0.0)
+
+
+def sample_windows(n, window=WINDOW, seed=None, edge_fraction=EDGE_FRACTION):
+    # Error windows drifting around a random level, up to twice the typical scale;
+    # the first `edge_fraction` of them end next to the teacher's dead-band edges
+    rng = np.random.default_rng(seed)
+    level = rng.uniform(-2.0, 2.0, (n, 1, 2)) * ERROR_SCALE
+    edges = int(n * edge_fraction)
+    sign = rng.choice((-1.0, 1.0), (edges, 1, 2))
+    level[:edges] = sign * rng.uniform(0.8, 1.2, (edges, 1, 2)) * TEACHER_DEADBAND
+    drift = rng.normal(0.0, 0.1, (n, window, 2)).cumsum(axis=1)
+    return level + (drift - drift[:, -1:]) * ERROR_SCALE
+
+
+def train(controller, errors, targets, epochs=300, batch_size=512, learning_rate=1e-2,
+          final_learning_rate=1e-4, seed=None):
+    # Mini-batch Adam on the mean squared error in normalized output units; the
+    # step size decays geometrically so the late epochs can sharpen the dead-band edges
+    rng = np.random.default_rng(seed)
+    x_all = (errors / controller.input_scale).reshape(len(errors), -1)
+    y_all = targets / controller.output_scale
+    params = controller.weights + controller.biases
+    moments = [np.zeros_like(p) for p in params]
+    velocities = [np.zeros_like(p) for p in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    layers = len(controller.weights)
+    t = 0
+
+    for epoch in range(epochs):
+        rate = learning_rate * (final_learning_rate / learning_rate) ** (epoch / max(epochs - 1, 1))
+        order = rng.permutation(len(x_all))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            activations = controller._forward(x_all[batch])
+            delta = 2.0 * (activations[-1] - y_all[batch]) / len(batch)
+            grads_w, grads_b = [None] * layers, [None] * layers
+            for i in range(layers - 1, -1, -1):
+                grads_w[i] = activations[i].T @ delta
+                grads_b[i] = delta.sum(axis=0)
+                if i:
+                    delta = (delta @ controller.weights[i].T) * (1.0 - activations[i] ** 2)
+
+            t += 1
+            for p, g, m, v in zip(params, grads_w + grads_b, moments, velocities):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                p -= rate * (m / (1 - beta1 ** t)) / (np.sqrt(v / (1 - beta2 ** t)) + eps)
+
+        loss = np.mean((controller._forward(x_all)[-1] - y_all) ** 2)
+        print(f"epoch {epoch + 1}/{epochs}: loss {loss:.5f}")
+    return controller
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=200000, help="training windows drawn from the teacher rule")
+    parser.add_argument('--epochs', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=WEIGHTS_PATH, help="where to write the .npz weights")
+    args = parser.parse_args(argv)
+
+    errors = sample_windows(args.samples, seed=args.seed)
+    controller = MLPController.random(seed=args.seed)
+    train(controller, errors, teacher_rates(errors), epochs=args.epochs, seed=args.seed)
+    controller.save(args.output)
+    print(f"saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
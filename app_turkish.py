@@ -1,11 +1,37 @@
-import streamlit as st
 import numpy as np
-import random
-import time
-import datetime
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import streamlit as st
+
+from controllers import available as available_controllers
+from downsample import Downsampler
+from history import THREE_PHASE_CHANNELS, MemmapHistory
+from microgrid_engine import MicrogridEngine
+from profiling import HISTOGRAM_EDGES_NS, PROFILER
+from simulation_runner import INVERTER_COUNT, NETWORK_BUSES, SimulationRunner
+from telemetry_store import HAVE_PYARROW
+
+# Seconds between refreshes of each live dashboard fragment
+METRICS_PERIOD = 1.0
+CHARTS_PERIOD = 2.0
+POWER_FLOW_PERIOD = 1.0
+
+# Memory-mapped history shared with the simulation worker; survives restarts
+HISTORY_FILE = "history.mmap"
+
+# Directory of the day-partitioned Parquet telemetry store
+TELEMETRY_DIR = "telemetry"
+
+# Seconds a control action waits for the simulation worker to apply it
+COMMAND_TIMEOUT = 1.0
+
+# Selectable number of points kept in the monitoring history
+HISTORY_CAPACITIES = [50, 1000, 10000, 100000]
+
+# Selectable loop rates in seconds: physics substep, secondary and tertiary
+# control periods (simulated time) and chart redraw period (wall time)
+PHYSICS_STEPS = [1.0, 0.1, 0.01, 0.001]
+SECONDARY_PERIODS = [0.1, 1.0, 5.0]
+TERTIARY_PERIODS = [1.0, 60.0, 300.0]
+RENDER_PERIODS = [0.5, 1.0, 2.0, 5.0]
 
 # Page configuration
 st.set_page_config(
@@ -53,274 +79,286 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# One simulation per server process, shared read-only by every viewer
+# Secondary control starts on the proportional rule; the MLP is selectable from the sidebar
+@st.cache_resource
+def get_shared_runner():
+    engine = MicrogridEngine()
+    return SimulationRunner(engine, MemmapHistory(HISTORY_FILE, HISTORY_CAPACITIES[0]), profiler=PROFILER)
+
+# Downsampling cache shared by every viewer of the shared simulation
+@st.cache_resource
+def get_downsampler():
+    return Downsampler()
+
+# Control actions are serialized through the shared runner's command queue
+def send_command(name, value):
+    done = st.session_state.runner.submit(name, value)
+    if not done.wait(COMMAND_TIMEOUT):
+        st.warning(f"'{name}' komutu henüz uygulanmadı; simülasyon meşgul")
+    elif done.error is not None:
+        st.error(f"'{name}' komutu uygulanamadı: {done.error}")
+
 # Initialize session state
 def initialize_session_state():
-    if 'simulation_running' not in st.session_state:
-        st.session_state.simulation_running = False
-    if 'secondary_ai_enabled' not in st.session_state:
-        st.session_state.secondary_ai_enabled = True
-    if 'tertiary_ai_enabled' not in st.session_state:
-        st.session_state.tertiary_ai_enabled = True
-    if 'island_mode' not in st.session_state:
-        st.session_state.island_mode = False
-    if 'battery_soc' not in st.session_state:
-        st.session_state.battery_soc = 80.0
-    if 'voltage' not in st.session_state:
-        st.session_state.voltage = 230.0
-    if 'frequency' not in st.session_state:
-        st.session_state.frequency = 50.0
-    if 'pv_output' not in st.session_state:
-        st.session_state.pv_output = 3.0
-    if 'load_demand' not in st.session_state:
-        st.session_state.load_demand = 3.5
-    if 'grid_power' not in st.session_state:
-        st.session_state.grid_power = 0.5
-    if 'data_history' not in st.session_state:
-        st.session_state.data_history = {
-            'time': [],
-            'voltage': [],
-            'frequency': [],
-            'battery_soc': [],
-            'pv_output': [],
-            'load_demand': [],
-            'grid_power': []
-        }
-    if 'scenario_flags' not in st.session_state:
-        st.session_state.scenario_flags = {
-            'load_ramp': False,
-            'pv_drop': False,
-            'battery_disconnect': False,
-            'grid_blackout': False,
-            'peak_load': False
-        }
-    if 'last_update' not in st.session_state:
-        st.session_state.last_update = time.time()
+    st.session_state.runner = get_shared_runner()
+    if 'combined_charts' not in st.session_state:
+        st.session_state.combined_charts = False
+    if 'charts_period' not in st.session_state:
+        st.session_state.charts_period = CHARTS_PERIOD
+    if 'show_performance' not in st.session_state:
+        st.session_state.show_performance = False
 
-# Microgrid simulation logic
-def update_microgrid_state():
-    if not st.session_state.simulation_running:
-        return
-    
-    current_time = time.time()
-    dt = current_time - st.session_state.last_update
-    st.session_state.last_update = current_time
-    
-    # Base values with random fluctuations
-    base_pv = 3.0 + random.uniform(-0.3, 0.3)
-    base_load = 3.5 + random.uniform(-0.5, 0.5)
-    
-    # Apply scenario effects
-    if st.session_state.scenario_flags['pv_drop']:
-        base_pv *= 0.3  # 70% drop
-    if st.session_state.scenario_flags['load_ramp']:
-        base_load += 1.5  # Additional 1.5 kW
-    if st.session_state.scenario_flags['peak_load']:
-        base_load += 2.0  # Peak surge
+# Create charts; Plotly is only imported once there is something to plot
+def create_charts(history):
+    if len(history) < 2:
+        return None, None, None, None, None, None
     
-    st.session_state.pv_output = max(0, base_pv)
-    st.session_state.load_demand = max(0.5, base_load)
+    if 'chart_set' not in st.session_state:
+        from charts import ChartSet
+        st.session_state.chart_set = ChartSet(get_downsampler())
+    return st.session_state.chart_set.update(history)
+
+def create_three_phase_charts(history):
+    if len(history) < 2:
+        return None, None
+    
+    if 'three_phase_chart_set' not in st.session_state:
+        from charts import THREE_PHASE_CHART_SPECS, ChartSet
+        st.session_state.three_phase_chart_set = ChartSet(get_downsampler(), THREE_PHASE_CHART_SPECS)
+    return st.session_state.three_phase_chart_set.update(history)
+
+# The combined figure is rebuilt when history gains or loses optional channels
+def create_combined_chart(history):
+    if len(history) < 2:
+        return None
+    
+    from charts import CombinedChart, specs_for
+    specs = specs_for(history.dtype.names)
+    if 'combined_chart' not in st.session_state or st.session_state.combined_chart.specs != specs:
+        st.session_state.combined_chart = CombinedChart(downsampler=get_downsampler(), specs=specs)
+    return st.session_state.combined_chart.update(history)
+
+# Status cards only change through sidebar actions, which rerun the whole page
+def status_cards(runner):
+    engine = runner.engine
+    col1, col2, col3, col4 = st.columns(4)
     
-    # Battery management
-    if not st.session_state.scenario_flags['battery_disconnect']:
-        power_balance = st.session_state.pv_output - st.session_state.load_demand
-        
-        if power_balance > 0:  # Excess power - charge battery
-            charge_power = min(power_balance, 2.0)  # Max 2kW charging
-            if st.session_state.battery_soc < 95:
-                st.session_state.battery_soc += (charge_power * dt / 3600) * 20  # Simplified SoC calculation
-            power_balance -= charge_power
-        elif power_balance < 0 and st.session_state.battery_soc > 10:  # Discharge battery
-            discharge_power = min(abs(power_balance), 2.0)  # Max 2kW discharge
-            st.session_state.battery_soc -= (discharge_power * dt / 3600) * 20
-            power_balance += discharge_power
-        
-        st.session_state.battery_soc = max(0, min(100, st.session_state.battery_soc))
+    with col1:
+        status_color = "status-online" if runner.running else "status-warning" if runner.error else "status-offline"
+        status = '🟢 ÇEVRIMIÇI' if runner.running else '⚠️ HATA' if runner.error else '🔴 ÇEVRIMDIŞI'
+        st.markdown(f"""
+        <div class="metric-card">
+            <span class="status-indicator {status_color}"></span>
+            <strong>Sistem Durumu</strong><br>
+            {status}
+        </div>
+        """, unsafe_allow_html=True)
     
-    # Grid interaction
-    if st.session_state.scenario_flags['grid_blackout'] or st.session_state.island_mode:
-        st.session_state.grid_power = 0
-    else:
-        st.session_state.grid_power = power_balance
+    with col2:
+        ai_status = "🟢 AKTIF" if engine.secondary_ai_enabled else "🔴 PASIF"
+        st.markdown(f"""
+        <div class="metric-card">
+            <span class="status-indicator {'status-online' if engine.secondary_ai_enabled else 'status-offline'}"></span>
+            <strong>İkincil AI</strong><br>
+            {ai_status}
+        </div>
+        """, unsafe_allow_html=True)
     
-    # Primary Control (Droop) - Frequency and Voltage regulation
-    nominal_freq = 50.0
-    nominal_voltage = 230.0
+    with col3:
+        ai_status = "🟢 AKTIF" if engine.tertiary_ai_enabled else "🔴 PASIF"
+        st.markdown(f"""
+        <div class="metric-card">
+            <span class="status-indicator {'status-online' if engine.tertiary_ai_enabled else 'status-offline'}"></span>
+            <strong>Üçüncül AI</strong><br>
+            {ai_status}
+        </div>
+        """, unsafe_allow_html=True)
     
-    # Frequency droop based on power imbalance
-    power_imbalance = st.session_state.pv_output + abs(st.session_state.grid_power) - st.session_state.load_demand
-    freq_deviation = -power_imbalance * 0.05  # Droop coefficient
-    st.session_state.frequency = nominal_freq + freq_deviation + random.uniform(-0.1, 0.1)
+    with col4:
+        mode_status = "🏝️ ADA" if engine.island_mode else "🔗 ŞEBEKE-BAĞLI"
+        st.markdown(f"""
+        <div class="metric-card">
+            <span class="status-indicator {'status-warning' if engine.island_mode else 'status-online'}"></span>
+            <strong>Çalışma Modu</strong><br>
+            {mode_status}
+        </div>
+        """, unsafe_allow_html=True)
     
-    # Voltage regulation
-    voltage_deviation = random.uniform(-3, 3)
-    st.session_state.voltage = nominal_voltage + voltage_deviation
+    if runner.error:
+        st.error(f"Simülasyon bir hata nedeniyle durdu: {runner.error}")
+
+# Live fragments; each re-executes on its own timer from the runner's latest snapshot
+def live_metrics():
+    state = st.session_state.runner.snapshot
+    col1, col2, col3, col4 = st.columns(4)
     
-    # Secondary Control (ANN simulation)
-    if st.session_state.secondary_ai_enabled:
-        # Gradual correction towards nominal values
-        freq_error = st.session_state.frequency - nominal_freq
-        voltage_error = st.session_state.voltage - nominal_voltage
-        
-        if abs(freq_error) > 0.2:  # Threshold
-            correction_factor = 0.2 * dt  # 5-second correction time
-            st.session_state.frequency -= freq_error * correction_factor
-        
-        if abs(voltage_error) > 5:  # Threshold
-            correction_factor = 0.2 * dt
-            st.session_state.voltage -= voltage_error * correction_factor
+    with col1:
+        st.metric("Gerilim", f"{state['voltage']:.1f} V", f"{state['voltage']-230:.1f}")
+    with col2:
+        st.metric("Frekans", f"{state['frequency']:.2f} Hz", f"{state['frequency']-50:.2f}")
+    with col3:
+        st.metric("Batarya SoC", f"{state['battery_soc']:.1f} %", f"{state['battery_soc']-80:.1f}")
+    with col4:
+        grid_direction = "İhracat" if state['grid_power'] > 0 else "İthalat"
+        st.metric("Şebeke Gücü", f"{abs(state['grid_power']):.2f} kW", grid_direction)
+
+# Serializing the figure is most of a chart's server-side cost
+def render_chart(figure, key):
+    with PROFILER.span('render'):
+        st.plotly_chart(figure, use_container_width=True, key=key)
+
+def live_charts():
+    runner = st.session_state.runner
+    if runner.simulated:
+        st.caption(f"Hız: {runner.snapshot['sim_speed']:,.0f} simüle-s / s")
     
-    # Tertiary Control (RL simulation)
-    if st.session_state.tertiary_ai_enabled:
-        # Grid import optimization
-        if st.session_state.grid_power > 1.0:  # Import threshold
-            reduction_factor = 0.02 * dt  # 10-second optimization
-            st.session_state.grid_power *= (1 - reduction_factor)
+    # Create and display charts
+    with PROFILER.span('history_view'):
+        history = runner.history_view()
+    if st.session_state.combined_charts:
+        with PROFILER.span('figure_build'):
+            chart = create_combined_chart(history)
+        if chart is not None:
+            render_chart(chart, 'chart_combined')
+    else:
+        with PROFILER.span('figure_build'):
+            charts = create_charts(history)
+        if charts[0] is not None:
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                render_chart(charts[0], 'chart_voltage')  # Voltage
+                render_chart(charts[3], 'chart_pv_output')  # PV Output
+            
+            with col2:
+                render_chart(charts[1], 'chart_frequency')  # Frequency
+                render_chart(charts[4], 'chart_load_demand')  # Load Demand
+            
+            with col3:
+                render_chart(charts[2], 'chart_battery_soc')  # Battery SoC
+                render_chart(charts[5], 'chart_grid_power')  # Grid Power
         
-        # Battery SoC management
-        if st.session_state.battery_soc < 20:  # Low SoC threshold
-            # Prioritize charging by reducing load or increasing grid import
-            if not st.session_state.island_mode:
-                st.session_state.grid_power += 0.5 * dt
-    
-    # Clamp values to realistic ranges
-    st.session_state.frequency = max(49.5, min(50.5, st.session_state.frequency))
-    st.session_state.voltage = max(220, min(240, st.session_state.voltage))
-    
-    # Update data history
-    current_timestamp = datetime.datetime.now()
-    st.session_state.data_history['time'].append(current_timestamp)
-    st.session_state.data_history['voltage'].append(st.session_state.voltage)
-    st.session_state.data_history['frequency'].append(st.session_state.frequency)
-    st.session_state.data_history['battery_soc'].append(st.session_state.battery_soc)
-    st.session_state.data_history['pv_output'].append(st.session_state.pv_output)
-    st.session_state.data_history['load_demand'].append(st.session_state.load_demand)
-    st.session_state.data_history['grid_power'].append(st.session_state.grid_power)
-    
-    # Keep only last 50 data points
-    for key in st.session_state.data_history:
-        if len(st.session_state.data_history[key]) > 50:
-            st.session_state.data_history[key] = st.session_state.data_history[key][-50:]
+        # Recorded while the three-phase model is on
+        if THREE_PHASE_CHANNELS[0] in history.dtype.names:
+            charts = create_three_phase_charts(history)
+            if charts[0] is not None:
+                col1, col2 = st.columns(2)
+                with col1:
+                    render_chart(charts[0], 'chart_voltage_unbalance')  # Voltage unbalance
+                with col2:
+                    render_chart(charts[1], 'chart_neutral_current')  # Neutral current
 
-# Create charts
-def create_charts():
-    if len(st.session_state.data_history['time']) < 2:
-        return None, None, None, None, None, None
-    
-    # Voltage Chart
-    fig_voltage = go.Figure()
-    fig_voltage.add_trace(go.Scatter(
-        x=st.session_state.data_history['time'],
-        y=st.session_state.data_history['voltage'],
-        mode='lines',
-        name='Gerilim',
-        line=dict(color='#ff6b6b', width=2)
-    ))
-    fig_voltage.add_hline(y=230, line_dash="dash", line_color="gray", annotation_text="Nominal (230V)")
-    fig_voltage.update_layout(
-        title="AC Gerilim (V)",
-        yaxis_title="Gerilim (V)",
-        height=250,
-        showlegend=False,
-        margin=dict(l=0, r=0, t=30, b=0)
-    )
-    
-    # Frequency Chart
-    fig_frequency = go.Figure()
-    fig_frequency.add_trace(go.Scatter(
-        x=st.session_state.data_history['time'],
-        y=st.session_state.data_history['frequency'],
-        mode='lines',
-        name='Frekans',
-        line=dict(color='#4ecdc4', width=2)
-    ))
-    fig_frequency.add_hline(y=50, line_dash="dash", line_color="gray", annotation_text="Nominal (50Hz)")
-    fig_frequency.update_layout(
-        title="AC Frekans (Hz)",
-        yaxis_title="Frekans (Hz)",
-        height=250,
-        showlegend=False,
-        margin=dict(l=0, r=0, t=30, b=0)
-    )
-    
-    # Battery SoC Chart
-    fig_battery = go.Figure()
-    fig_battery.add_trace(go.Scatter(
-        x=st.session_state.data_history['time'],
-        y=st.session_state.data_history['battery_soc'],
-        mode='lines',
-        name='Batarya SoC',
-        line=dict(color='#45b7d1', width=2),
-        fill='tonexty'
-    ))
-    fig_battery.add_hline(y=20, line_dash="dash", line_color="red", annotation_text="Düşük SoC (20%)")
-    fig_battery.update_layout(
-        title="Batarya Şarj Durumu (%)",
-        yaxis_title="SoC (%)",
-        height=250,
-        showlegend=False,
-        margin=dict(l=0, r=0, t=30, b=0)
-    )
-    
-    # PV Output Chart
-    fig_pv = go.Figure()
-    fig_pv.add_trace(go.Scatter(
-        x=st.session_state.data_history['time'],
-        y=st.session_state.data_history['pv_output'],
-        mode='lines',
-        name='PV Çıkış',
-        line=dict(color='#f9ca24', width=2),
-        fill='tozeroy'
-    ))
-    fig_pv.update_layout(
-        title="PV Üretim (kW)",
-        yaxis_title="Güç (kW)",
-        height=250,
-        showlegend=False,
-        margin=dict(l=0, r=0, t=30, b=0)
-    )
+def live_power_flow():
+    state = st.session_state.runner.snapshot
+    col1, col2, col3, col4 = st.columns(4)
     
-    # Load Demand Chart
-    fig_load = go.Figure()
-    fig_load.add_trace(go.Scatter(
-        x=st.session_state.data_history['time'],
-        y=st.session_state.data_history['load_demand'],
-        mode='lines',
-        name='Yük Talebi',
-        line=dict(color='#e17055', width=2),
-        fill='tozeroy'
-    ))
-    fig_load.update_layout(
-        title="Yük Talebi (kW)",
-        yaxis_title="Güç (kW)",
-        height=250,
-        showlegend=False,
-        margin=dict(l=0, r=0, t=30, b=0)
+    with col1:
+        st.metric("PV Üretim", f"{state['pv_output']:.2f} kW", "☀️")
+    with col2:
+        st.metric("Yük Tüketimi", f"{state['load_demand']:.2f} kW", "🏭")
+    with col3:
+        battery_power = state['battery_power']
+        battery_status = "Şarj" if battery_power > 0 else "Deşarj" if battery_power < 0 else "Boşta"
+        st.metric("Batarya Gücü", f"{abs(battery_power):.2f} kW", battery_status)
+        if 'battery_voltage' in state:
+            st.caption(f"{state['battery_voltage']:.1f} V · {abs(state['battery_current']):.1f} A")
+    with col4:
+        grid_power = state['grid_power']
+        grid_status = "İhracat" if grid_power > 0 else "İthalat" if grid_power < 0 else "Dengeli"
+        st.metric("Şebeke Değişimi", f"{abs(grid_power):.2f} kW", grid_status)
+    
+    if 'phase_voltage' in state:
+        columns = st.columns(5)
+        for column, phase, voltage, current in zip(columns, "ABC", state['phase_voltage'], state['phase_current']):
+            with column:
+                st.metric(f"Faz {phase}", f"{voltage:.1f} V", f"{current:.1f} A", delta_color="off")
+        with columns[3]:
+            st.metric("Gerilim Dengesizliği", f"{state['voltage_unbalance']:.2f} %")
+        with columns[4]:
+            st.metric("Nötr Akımı", f"{state['neutral_current']:.1f} A")
+
+# Everything a page renders outside the live fragments, as set from any session
+def control_state(runner):
+    engine = runner.engine
+    clock = runner.clock
+    return (
+        runner.running, runner.simulated, runner.error, runner.store is not None, runner.history.capacity,
+        clock.dt, clock.secondary_period, clock.tertiary_period,
+        engine.secondary_ai_enabled, engine.tertiary_ai_enabled, engine.island_mode,
+        engine.secondary_controller.name, engine.tertiary_controller.name,
+        engine.network is not None, engine.inverters is not None,
+        engine.battery is not None, engine.three_phase is not None,
+        tuple(engine.scenario_flags.items()),
     )
+
+# Reruns the page once another session (or a failed tick) has changed the
+# shared simulation, so stopped fragments start their timers and cards update
+def watch_controls():
+    if control_state(st.session_state.runner) != st.session_state.control_state:
+        st.rerun()
+
+# Selectbox over preset rates; a rate set from another session may not be a preset
+def rate_selectbox(label, presets, current, help=None):
+    options = sorted(set(presets) | {current})
+    return st.selectbox(label, options, index=options.index(current), help=help)
+
+# Rolling timing statistics of the hot paths, for the whole server process
+def performance_panel():
+    runner = st.session_state.runner
+    summary = PROFILER.summary()
+    if not summary:
+        st.caption("Henüz ölçüm yok")
+        return
     
-    # Grid Power Chart
-    fig_grid = go.Figure()
-    colors = ['red' if x < 0 else 'green' for x in st.session_state.data_history['grid_power']]
-    fig_grid.add_trace(go.Scatter(
-        x=st.session_state.data_history['time'],
-        y=st.session_state.data_history['grid_power'],
-        mode='lines',
-        name='Şebeke Gücü',
-        line=dict(color='#6c5ce7', width=2)
-    ))
-    fig_grid.add_hline(y=0, line_dash="dash", line_color="gray")
-    fig_grid.update_layout(
-        title="Şebeke İthalat/İhracat (kW)",
-        yaxis_title="Güç (kW)",
-        height=250,
-        showlegend=False,
-        margin=dict(l=0, r=0, t=30, b=0)
+    names = list(summary)
+    st.dataframe({
+        'Bölüm': names,
+        'Adet': [summary[name]['count'] for name in names],
+        'Ort. (ms)': [summary[name]['mean_ms'] for name in names],
+        'p50 (ms)': [summary[name]['p50_ms'] for name in names],
+        'p95 (ms)': [summary[name]['p95_ms'] for name in names],
+        'p99 (ms)': [summary[name]['p99_ms'] for name in names],
+    }, hide_index=True)
+    
+    name = st.selectbox("Histogram", names, key='performance_span')
+    st.bar_chart(
+        {'log₁₀ süre (µs)': np.log10(HISTOGRAM_EDGES_NS[:-1] / 1e3), 'Adet': PROFILER.histogram(name)},
+        x='log₁₀ süre (µs)', y='Adet', height=200
     )
     
-    return fig_voltage, fig_frequency, fig_battery, fig_pv, fig_load, fig_grid
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "📥 JSON",
+            PROFILER.to_json(
+                history_points=len(runner.history),
+                history_capacity=runner.history.capacity,
+                dt=runner.clock.dt,
+                simulated=runner.simulated
+            ),
+            file_name="performance.json",
+            mime="application/json"
+        )
+    with col2:
+        if st.button("🔄 Sıfırla"):
+            PROFILER.reset()
+
+# Registered controllers of one layer; choosing another swaps it into the running engine
+def controller_selectbox(label, layer, current):
+    controllers = available_controllers(layer)
+    controllers.setdefault(current.name, current.label or current.name)
+    names = list(controllers)
+    name = st.selectbox(label, names, index=names.index(current.name), format_func=controllers.get)
+    if name != current.name:
+        send_command(f'{layer}_controller', name)
 
 # Main app
 def main():
     initialize_session_state()
+    runner = st.session_state.runner
+    engine = runner.engine
+    st.session_state.control_state = control_state(runner)
     
     # Header
     st.markdown("""
@@ -336,47 +374,146 @@ def main():
         
         # Main simulation control
         st.markdown("#### Sistem Kontrolü")
-        if st.button("🚀 Simülasyonu Başlat" if not st.session_state.simulation_running else "⏹️ Simülasyonu Durdur"):
-            st.session_state.simulation_running = not st.session_state.simulation_running
+        if st.button("🚀 Simülasyonu Başlat" if not runner.running else "⏹️ Simülasyonu Durdur"):
+            send_command('running', not runner.running)
+            st.rerun()
+        
+        st.markdown("#### Zaman Modu")
+        simulated = st.checkbox(
+            "⏩ Simüle Saat",
+            value=runner.simulated,
+            help="Sabit zaman adımıyla gerçek zamandan hızlı simülasyon; mod değişince geçmiş sıfırlanır, telemetri yalnızca gerçek zamanda kaydedilir"
+        )
+        if simulated != runner.simulated:
+            send_command('simulated', simulated)
+        
+        st.markdown("#### Döngü Hızları")
+        clock = runner.clock
+        dt = rate_selectbox(
+            "Fizik Adımı (s)", PHYSICS_STEPS, clock.dt,
+            help="Birincil droop kontrolünün zaman adımı"
+        )
+        if dt != clock.dt:
+            send_command('dt', dt)
+        # The clock stores None for "every physics step"
+        secondary_period = rate_selectbox(
+            "İkincil Kontrol Periyodu (s)", SECONDARY_PERIODS, clock.secondary_period or clock.dt,
+            help="İkincil AI düzeltmesinin çalışma aralığı (fizik adımına yuvarlanır)"
+        )
+        if secondary_period != (clock.secondary_period or clock.dt):
+            send_command('secondary_period', secondary_period)
+        tertiary_period = rate_selectbox(
+            "Üçüncül Kontrol Periyodu (s)", TERTIARY_PERIODS, clock.tertiary_period or clock.dt,
+            help="Üçüncül AI optimizasyonunun çalışma aralığı (fizik adımına yuvarlanır)"
+        )
+        if tertiary_period != (clock.tertiary_period or clock.dt):
+            send_command('tertiary_period', tertiary_period)
+        st.session_state.charts_period = rate_selectbox(
+            "Grafik Yenileme (s)", RENDER_PERIODS, st.session_state.charts_period,
+            help="Bu oturumdaki grafiklerin yeniden çizilme aralığı"
+        )
+        
+        st.markdown("#### Veri Kaydı")
+        recording = st.checkbox(
+            "💾 Telemetri Kaydı",
+            value=runner.store is not None,
+            disabled=not HAVE_PYARROW,
+            help=f"Geçmişi günlük Parquet dosyalarına yaz ({TELEMETRY_DIR}/)" if HAVE_PYARROW else "pyarrow kurulu değil"
+        )
+        if recording != (runner.store is not None):
+            send_command('telemetry', TELEMETRY_DIR if recording else None)
+        
+        st.markdown("#### Grafik Ayarları")
+        # A restored history file may carry a capacity outside the presets
+        capacities = sorted(set(HISTORY_CAPACITIES) | {runner.history.capacity})
+        capacity = st.selectbox(
+            "Geçmiş Kapasitesi",
+            capacities,
+            index=capacities.index(runner.history.capacity),
+            help="Grafiklerde tutulan veri noktası sayısı"
+        )
+        if capacity != runner.history.capacity:
+            send_command('resize_history', capacity)
+        st.session_state.combined_charts = st.checkbox(
+            "🖥️ Birleşik Grafik (WebGL)",
+            value=st.session_state.combined_charts,
+            help="Tüm kanalları tek bir WebGL figüründe çiz"
+        )
         
         st.markdown("#### AI Kontrol Sistemleri")
-        st.session_state.secondary_ai_enabled = st.checkbox(
+        secondary_ai_enabled = st.checkbox(
             "🧠 İkincil AI (ANN)", 
-            value=st.session_state.secondary_ai_enabled,
+            value=engine.secondary_ai_enabled,
             help="Gerilim/frekans düzenlemesi için Yapay Sinir Ağı"
         )
-        st.session_state.tertiary_ai_enabled = st.checkbox(
+        if secondary_ai_enabled != engine.secondary_ai_enabled:
+            send_command('secondary_ai_enabled', secondary_ai_enabled)
+        controller_selectbox("İkincil Kontrolcü", 'secondary', engine.secondary_controller)
+        tertiary_ai_enabled = st.checkbox(
             "🤖 Üçüncül AI (RL)", 
-            value=st.session_state.tertiary_ai_enabled,
+            value=engine.tertiary_ai_enabled,
             help="Ekonomik optimizasyon için Pekiştirmeli Öğrenme"
         )
+        if tertiary_ai_enabled != engine.tertiary_ai_enabled:
+            send_command('tertiary_ai_enabled', tertiary_ai_enabled)
+        controller_selectbox("Üçüncül Kontrolcü", 'tertiary', engine.tertiary_controller)
         
         st.markdown("#### Çalışma Modu")
-        st.session_state.island_mode = st.checkbox(
+        island_mode = st.checkbox(
             "🏝️ Ada Modu", 
-            value=st.session_state.island_mode,
+            value=engine.island_mode,
             help="Ana şebekeden bağlantıyı kes"
         )
+        if island_mode != engine.island_mode:
+            send_command('island_mode', island_mode)
+        network = st.checkbox(
+            f"🕸️ Şebeke Modeli ({NETWORK_BUSES} bara)",
+            value=engine.network is not None,
+            help="Gerilim ve şebeke gücünü çok baralı AC yük akışından hesapla (besleyici sonu gerilimi gösterilir)"
+        )
+        if network != (engine.network is not None):
+            send_command('network', network)
+        inverters = st.checkbox(
+            f"🔌 Dağıtık Eviriciler ({INVERTER_COUNT})",
+            value=engine.inverters is not None,
+            help="Birincil kontrolü her biri kendi P-f / Q-V droop eğrisine sahip eviricilerle paylaştır"
+        )
+        if inverters != (engine.inverters is not None):
+            send_command('inverters', inverters)
+        battery = st.checkbox(
+            "🔋 Batarya Modeli (Thevenin RC)",
+            value=engine.battery is not None,
+            help="5 kWh LFP paketi: OCV-SoC eğrisi, iç direnç ve RC polarizasyonu, verim ve C-oranı sınırları"
+        )
+        if battery != (engine.battery is not None):
+            send_command('battery', battery)
+        three_phase = st.checkbox(
+            "⚖️ Üç Fazlı Dengesiz Mod",
+            value=engine.three_phase is not None,
+            help="Yük ve PV'yi fazlara dengesiz dağıt; faz gerilim/akımlarını, gerilim dengesizliğini ve nötr akımını hesapla"
+        )
+        if three_phase != (engine.three_phase is not None):
+            send_command('three_phase', three_phase)
         
         st.markdown("#### Senaryo Testi")
         col1, col2 = st.columns(2)
         
         with col1:
             if st.button("📈 Yük Artışı"):
-                st.session_state.scenario_flags['load_ramp'] = not st.session_state.scenario_flags['load_ramp']
+                send_command('toggle_scenario', 'load_ramp')
             
             if st.button("☀️ PV Düşüşü"):
-                st.session_state.scenario_flags['pv_drop'] = not st.session_state.scenario_flags['pv_drop']
+                send_command('toggle_scenario', 'pv_drop')
             
             if st.button("🔋 Batarya Kesintisi"):
-                st.session_state.scenario_flags['battery_disconnect'] = not st.session_state.scenario_flags['battery_disconnect']
+                send_command('toggle_scenario', 'battery_disconnect')
         
         with col2:
             if st.button("⚡ Şebeke Kesintisi"):
-                st.session_state.scenario_flags['grid_blackout'] = not st.session_state.scenario_flags['grid_blackout']
+                send_command('toggle_scenario', 'grid_blackout')
             
             if st.button("🔥 Pik Yük"):
-                st.session_state.scenario_flags['peak_load'] = not st.session_state.scenario_flags['peak_load']
+                send_command('toggle_scenario', 'peak_load')
         
         # Active scenarios display
         st.markdown("#### Aktif Senaryolar")
@@ -387,102 +524,36 @@ def main():
             'grid_blackout': 'Şebeke Kesintisi',
             'peak_load': 'Pik Yük'
         }
-        for scenario, active in st.session_state.scenario_flags.items():
+        for scenario, active in engine.scenario_flags.items():
             if active:
                 st.markdown(f"🔴 {scenario_names[scenario]}")
+        
+        st.markdown("#### Performans")
+        st.session_state.show_performance = st.checkbox(
+            "⏱️ Performans Paneli",
+            value=st.session_state.show_performance,
+            help="Fizik, kontrol, geçmiş, grafik oluşturma ve çizim sürelerinin dağılımı"
+        )
+        if st.session_state.show_performance:
+            st.fragment(performance_panel, run_every=METRICS_PERIOD if runner.running else None)()
     
-    # Main dashboard
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        status_color = "status-online" if st.session_state.simulation_running else "status-offline"
-        st.markdown(f"""
-        <div class="metric-card">
-            <span class="status-indicator {status_color}"></span>
-            <strong>Sistem Durumu</strong><br>
-            {'🟢 ÇEVRIMIÇI' if st.session_state.simulation_running else '🔴 ÇEVRIMDIŞI'}
-        </div>
-        """, unsafe_allow_html=True)
-        st.metric("Gerilim", f"{st.session_state.voltage:.1f} V", f"{st.session_state.voltage-230:.1f}")
-    
-    with col2:
-        ai_status = "🟢 AKTIF" if st.session_state.secondary_ai_enabled else "🔴 PASIF"
-        st.markdown(f"""
-        <div class="metric-card">
-            <span class="status-indicator {'status-online' if st.session_state.secondary_ai_enabled else 'status-offline'}"></span>
-            <strong>İkincil AI</strong><br>
-            {ai_status}
-        </div>
-        """, unsafe_allow_html=True)
-        st.metric("Frekans", f"{st.session_state.frequency:.2f} Hz", f"{st.session_state.frequency-50:.2f}")
+    # Main dashboard; static parts render once per interaction, live parts refresh on their own
+    def refresh(period):
+        return period if runner.running else None
     
-    with col3:
-        ai_status = "🟢 AKTIF" if st.session_state.tertiary_ai_enabled else "🔴 PASIF"
-        st.markdown(f"""
-        <div class="metric-card">
-            <span class="status-indicator {'status-online' if st.session_state.tertiary_ai_enabled else 'status-offline'}"></span>
-            <strong>Üçüncül AI</strong><br>
-            {ai_status}
-        </div>
-        """, unsafe_allow_html=True)
-        st.metric("Batarya SoC", f"{st.session_state.battery_soc:.1f} %", f"{st.session_state.battery_soc-80:.1f}")
-    
-    with col4:
-        mode_status = "🏝️ ADA" if st.session_state.island_mode else "🔗 ŞEBEKE-BAĞLI"
-        st.markdown(f"""
-        <div class="metric-card">
-            <span class="status-indicator {'status-warning' if st.session_state.island_mode else 'status-online'}"></span>
-            <strong>Çalışma Modu</strong><br>
-            {mode_status}
-        </div>
-        """, unsafe_allow_html=True)
-        grid_direction = "İhracat" if st.session_state.grid_power < 0 else "İthalat"
-        st.metric("Şebeke Gücü", f"{abs(st.session_state.grid_power):.2f} kW", grid_direction)
+    status_cards(runner)
+    st.fragment(live_metrics, run_every=refresh(METRICS_PERIOD))()
     
     # Charts section
     st.markdown("### 📊 Gerçek Zamanlı İzleme")
-    
-    # Update simulation state
-    if st.session_state.simulation_running:
-        update_microgrid_state()
-    
-    # Create and display charts
-    charts = create_charts()
-    if charts[0] is not None:
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.plotly_chart(charts[0], use_container_width=True)  # Voltage
-            st.plotly_chart(charts[3], use_container_width=True)  # PV Output
-        
-        with col2:
-            st.plotly_chart(charts[1], use_container_width=True)  # Frequency
-            st.plotly_chart(charts[4], use_container_width=True)  # Load Demand
-        
-        with col3:
-            st.plotly_chart(charts[2], use_container_width=True)  # Battery SoC
-            st.plotly_chart(charts[5], use_container_width=True)  # Grid Power
+    st.fragment(live_charts, run_every=refresh(st.session_state.charts_period))()
     
     # Power flow summary
     st.markdown("### ⚡ Güç Akışı Özeti")
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("PV Üretim", f"{st.session_state.pv_output:.2f} kW", "☀️")
-    with col2:
-        st.metric("Yük Tüketimi", f"{st.session_state.load_demand:.2f} kW", "🏭")
-    with col3:
-        battery_power = (st.session_state.pv_output - st.session_state.load_demand - st.session_state.grid_power)
-        battery_status = "Şarj" if battery_power > 0 else "Deşarj" if battery_power < 0 else "Boşta"
-        st.metric("Batarya Gücü", f"{abs(battery_power):.2f} kW", battery_status)
-    with col4:
-        grid_status = "İhracat" if st.session_state.grid_power < 0 else "İthalat" if st.session_state.grid_power > 0 else "Dengeli"
-        st.metric("Şebeke Değişimi", f"{abs(st.session_state.grid_power):.2f} kW", grid_status)
+    st.fragment(live_power_flow, run_every=refresh(POWER_FLOW_PERIOD))()
     
-    # Auto-refresh every 2 seconds when simulation is running
-    if st.session_state.simulation_running:
-        time.sleep(2)
-        st.rerun()
+    # Runs even while the simulation is stopped, unlike the live fragments
+    st.fragment(watch_controls, run_every=METRICS_PERIOD)()
 
 if __name__ == "__main__":
     main()
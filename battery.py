@@ -0,0 +1,82 @@
+import numpy as np
+
+# Open-circuit voltage of one LiFePO4 cell against SoC (%); flat through the
+# middle, steep near empty and full
+OCV_SOC = np.array([0.0, 5.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0, 95.0, 100.0])
+OCV_CELL = np.array([2.50, 3.00, 3.20, 3.25, 3.28, 3.29, 3.30, 3.31, 3.32, 3.33, 3.35, 3.40, 3.60])
+
+# 16 cells in series: the usual 48 V (51.2 V nominal) storage pack
+SERIES_CELLS = 16
+NOMINAL_CELL_VOLTAGE = 3.2
+
+
+class Battery:
+    """Battery pack as a Thevenin equivalent circuit: OCV(SoC) - R0 - (R1 || C1).
+
+    Parameters broadcast like the engine state, scalars for a MicrogridEngine
+    or (n_sites,) arrays for a FleetEngine. The SoC stays with the engine and
+    is passed in and returned by step(); the pack keeps only the RC
+    polarization voltage. Each step holds the current constant, so the RC
+    voltage follows its exact exponential solution and the SoC its exact
+    linear one, and the current is capped by the C-rate and by the charge
+    left before the SoC limits over the whole step: any dt stays stable and
+    the SoC lands on its limit instead of overshooting it.
+    """
+
+    def __init__(self, capacity_kwh=5.0, charge_efficiency=0.98, discharge_efficiency=0.98,
+                 max_charge_c=0.4, max_discharge_c=0.4, r0_ohm=0.02, r1_ohm=0.015, c1_farad=2000.0,
+                 soc_min=10.0, soc_max=95.0, ocv_soc=OCV_SOC, ocv_voltage=OCV_CELL * SERIES_CELLS):
+        self.capacity_kwh = np.asarray(capacity_kwh, dtype=float)
+        # Coulombic efficiencies: charge stored per charge drawn, and its inverse when discharging
+        self.charge_efficiency = np.asarray(charge_efficiency, dtype=float)
+        self.discharge_efficiency = np.asarray(discharge_efficiency, dtype=float)
+        self.max_charge_c = np.asarray(max_charge_c, dtype=float)
+        self.max_discharge_c = np.asarray(max_discharge_c, dtype=float)
+        self.r0_ohm = np.asarray(r0_ohm, dtype=float)
+        self.r1_ohm = np.asarray(r1_ohm, dtype=float)
+        self.tau = self.r1_ohm * np.asarray(c1_farad, dtype=float)
+        self.soc_min = np.asarray(soc_min, dtype=float)
+        self.soc_max = np.asarray(soc_max, dtype=float)
+        self.ocv_soc = np.asarray(ocv_soc, dtype=float)
+        self.ocv_voltage = np.asarray(ocv_voltage, dtype=float)
+        self.capacity_ah = self.capacity_kwh * 1000 / (NOMINAL_CELL_VOLTAGE * SERIES_CELLS)
+        self.rc_voltage = np.zeros(np.shape(self.capacity_kwh))
+        # Outputs of the last step(); current is positive discharging
+        self.current = None
+        self.terminal_voltage = None
+
+    def step(self, power_kw, soc, dt):
+        # Draws `power_kw` (positive charging, as in the engines) for dt
+        # seconds from SoC `soc` (%); returns the power actually exchanged at
+        # the terminals and the new SoC
+        soc = np.asarray(soc, dtype=float)
+        # EMF behind R0; the RC voltage is a drop while discharging
+        emf = np.interp(soc, self.ocv_soc, self.ocv_voltage) - self.rc_voltage
+
+        # Terminal power P = (emf - R0 I) I for the requested discharge power;
+        # the smaller root, and the peak-power current when P is out of reach
+        discharge_w = -np.asarray(power_kw, dtype=float) * 1000
+        discriminant = np.maximum(emf * emf - 4 * self.r0_ohm * discharge_w, 0.0)
+        current = (emf - np.sqrt(discriminant)) / (2 * self.r0_ohm)
+
+        # C-rate limits, and the charge left to the SoC limits in this step
+        charge_as = self.capacity_ah * 36  # Ampere-seconds per % SoC
+        max_discharge = np.minimum(
+            self.max_discharge_c * self.capacity_ah,
+            np.maximum(soc - self.soc_min, 0.0) * charge_as * self.discharge_efficiency / dt,
+        )
+        max_charge = np.minimum(
+            self.max_charge_c * self.capacity_ah,
+            np.maximum(self.soc_max - soc, 0.0) * charge_as / (self.charge_efficiency * dt),
+        )
+        current = np.clip(current, -max_charge, max_discharge)
+
+        # Exact solutions for a current held over the step
+        decay = np.exp(-dt / self.tau)
+        self.rc_voltage = self.rc_voltage * decay + self.r1_ohm * current * (1 - decay)
+        efficiency = np.where(current > 0, 1 / self.discharge_efficiency, self.charge_efficiency)
+        soc = soc - current * efficiency * dt / charge_as
+
+        self.terminal_voltage = emf - self.r0_ohm * current
+        self.current = current
+        return -self.terminal_voltage * current / 1000, soc
@@ -0,0 +1,224 @@
+"""Throughput of the simulation, history and charting hot paths, tracked across commits.
+
+Measures physics steps per second for 1, 100 and 10k sites, the cost of one
+history append at several capacities, chart build and serialization time
+against the number of points, and peak RSS. Each figure is the best of
+--repeat runs. Results are appended to a JSON-lines log and compared with
+an earlier record, so regressions show up next to the commit that caused them.
+
+    python benchmarks/hot_paths.py --repeat 3 --threshold 10
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fleet_engine import FleetEngine  # noqa: E402
+from history import HistoryBuffer, MemmapHistory  # noqa: E402
+from microgrid_engine import MicrogridEngine  # noqa: E402
+from import_time import git_revision  # noqa: E402
+
+LOG_PATH = os.path.join(ROOT, 'benchmarks', 'results', 'hot_paths.jsonl')
+
+SITE_COUNTS = (1, 100, 10000)
+HISTORY_CAPACITIES = (50, 10000, 1000000)
+CHART_POINTS = (50, 1000, 10000, 100000)
+
+# Wall seconds spent on each physics and append measurement
+MEASURE_SECONDS = 0.5
+
+
+def best_of(repeat, measure):
+    return min(measure() for _ in range(repeat))
+
+
+def physics_step_time(n_sites):
+    # Seconds per step() call; one call advances every site
+    engine = MicrogridEngine(seed=0) if n_sites == 1 else FleetEngine(n_sites, seed=0)
+    engine.step(1.0)  # Warm-up: first noise block
+    steps = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(64):
+            engine.step(1.0)
+        steps += 64
+        elapsed = time.perf_counter() - start
+        if elapsed >= MEASURE_SECONDS:
+            return elapsed / steps
+
+
+def fill_history(history, n, engine=None):
+    # n records of real engine output, one second apart
+    engine = engine or MicrogridEngine(seed=0)
+    start = np.datetime64('2024-01-01T00:00:00', 'us')
+    for i in range(n):
+        engine.step(1.0)
+        history.append(start + np.timedelta64(i, 's'), engine.snapshot())
+    return history
+
+
+def history_append_time(history):
+    # Seconds per append once the ring has wrapped, so every append overwrites
+    values = MicrogridEngine(seed=0).snapshot()
+    timestamp = np.datetime64('2024-01-01T00:00:00', 'us')
+    appends = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(256):
+            history.append(timestamp, values)
+        appends += 256
+        elapsed = time.perf_counter() - start
+        if elapsed >= MEASURE_SECONDS:
+            return elapsed / appends
+
+
+def chart_times(history, downsampler):
+    # Seconds to update the six figures and to serialize them the way st.plotly_chart does
+    import plotly.io
+
+    from charts import ChartSet
+
+    charts = ChartSet(downsampler)
+    start = time.perf_counter()
+    figures = charts.update(history.view())
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    payload = sum(len(plotly.io.to_json(figure, validate=False)) for figure in figures)
+    serialize = time.perf_counter() - start
+    return build, serialize, payload
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run(repeat):
+    from downsample import Downsampler
+
+    results = {'physics': {}, 'history_append': {}, 'charts': {}}
+    metrics = {}  # Flat, lower is better; what --threshold compares
+
+    for n_sites in SITE_COUNTS:
+        step_time = best_of(repeat, lambda: physics_step_time(n_sites))
+        results['physics'][n_sites] = {
+            'steps_per_s': 1 / step_time,
+            'site_steps_per_s': n_sites / step_time,
+        }
+        metrics[f'physics.{n_sites}_sites.us_per_step'] = step_time * 1e6
+        print(f"physics   {n_sites:>7} sites  {1 / step_time:>12,.0f} steps/s  {n_sites / step_time:>14,.0f} site-steps/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for capacity in HISTORY_CAPACITIES:
+            backends = {
+                'memory': HistoryBuffer(capacity),
+                'memmap': MemmapHistory(os.path.join(directory, f'{capacity}.mmap'), capacity),
+            }
+            for backend, history in backends.items():
+                append_time = best_of(repeat, lambda: history_append_time(history))
+                results['history_append'].setdefault(backend, {})[capacity] = {'ns_per_append': append_time * 1e9}
+                metrics[f'history_append.{backend}.{capacity}.ns'] = append_time * 1e9
+                print(f"append    {backend:>6} {capacity:>9,}  {append_time * 1e9:>10,.0f} ns")
+            del backends, history
+
+    engine = MicrogridEngine(seed=0)
+    history = HistoryBuffer(max(CHART_POINTS))
+    filled = 0
+    for points in CHART_POINTS:
+        fill_history(history, points - filled, engine)
+        filled = points
+        for label, downsampler in (('m4', Downsampler(maxsize=0)), ('raw', None)):
+            times = [chart_times(history, downsampler) for _ in range(repeat)]
+            build = min(t[0] for t in times)
+            serialize = min(t[1] for t in times)
+            results['charts'].setdefault(label, {})[points] = {
+                'build_ms': build * 1e3,
+                'serialize_ms': serialize * 1e3,
+                'payload_bytes': times[0][2],
+            }
+            metrics[f'charts.{label}.{points}.build_ms'] = build * 1e3
+            metrics[f'charts.{label}.{points}.serialize_ms'] = serialize * 1e3
+            print(f"charts    {label:>4} {points:>8,} pts  build {build * 1e3:8.2f} ms  "
+                  f"serialize {serialize * 1e3:8.2f} ms  {times[0][2] / 1024:8.1f} KiB")
+
+    results['peak_rss_mb'] = peak_rss_mb()
+    metrics['peak_rss_mb'] = results['peak_rss_mb']
+    print(f"peak RSS  {results['peak_rss_mb']:.1f} MiB")
+    return results, metrics
+
+
+def find_record(path, revision=None):
+    # Last record, or the last one taken at `revision`
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if revision is not None:
+        records = [record for record in records if record.get('revision') == revision]
+    return records[-1] if records else None
+
+
+def regressions(metrics, baseline, threshold):
+    # Metrics slower than the baseline by more than `threshold` percent
+    slower = {}
+    for name, value in metrics.items():
+        previous = baseline.get(name)
+        if previous:
+            change = (value - previous) / previous * 100
+            if change > threshold:
+                slower[name] = change
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement; the fastest counts")
+    parser.add_argument('--log', default=LOG_PATH, help="JSON-lines file the result is appended to")
+    parser.add_argument('--baseline', help="revision to compare with (default: the previous record)")
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="exit with status 1 if any metric is slower than the baseline by this many percent")
+    args = parser.parse_args(argv)
+
+    results, metrics = run(args.repeat)
+    record = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'repeat': args.repeat,
+        'results': results,
+        'metrics': metrics,
+    }
+
+    baseline = find_record(args.log, args.baseline)
+    os.makedirs(os.path.dirname(args.log), exist_ok=True)
+    with open(args.log, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+    if baseline is None:
+        if args.baseline is not None:
+            print(f"no record for revision {args.baseline} in {args.log}")
+        return 0
+    slower = regressions(metrics, baseline.get('metrics', {}), args.threshold if args.threshold is not None else 0.0)
+    print(f"vs {baseline.get('revision') or baseline['timestamp']}: {len(slower)} of {len(metrics)} metrics slower")
+    for name, change in sorted(slower.items(), key=lambda item: -item[1]):
+        print(f"  {change:+7.1f}%  {name}")
+    if args.threshold is not None and slower:
+        print(f"hot paths regressed by more than {args.threshold:.0f}%")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
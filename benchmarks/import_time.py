@@ -0,0 +1,104 @@
+"""Cold-start import time of the dashboard, tracked across commits.
+
+Imports app_turkish in fresh interpreters under `python -X importtime`,
+keeps the best of N runs and appends it to a JSON-lines log so startup
+regressions show up next to the commit that caused them.
+
+    python benchmarks/import_time.py --runs 5 --threshold 10
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_PATH = os.path.join(ROOT, 'benchmarks', 'results', 'import_time.jsonl')
+
+
+def measure_once(module):
+    # `-X importtime` prints "import time: self [us] | cumulative | name" on stderr
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    total = 0
+    top_level = {}
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # A module is listed after everything it imported
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == module:
+                total, top_level = int(cumulative), children
+            children = {}
+    return total, top_level
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def last_record(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app_turkish')
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to start; the fastest counts")
+    parser.add_argument('--log', default=LOG_PATH, help="JSON-lines file the result is appended to")
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="exit with status 1 if slower than the previous record by this many percent")
+    parser.add_argument('--top', type=int, default=10, help="number of slowest direct imports to show")
+    args = parser.parse_args(argv)
+
+    best_total, best_modules = min((measure_once(args.module) for _ in range(args.runs)), key=lambda run: run[0])
+    record = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'module': args.module,
+        'runs': args.runs,
+        'total_us': best_total,
+        'imports_us': dict(sorted(best_modules.items(), key=lambda item: -item[1])),
+    }
+
+    previous = last_record(args.log)
+    os.makedirs(os.path.dirname(args.log), exist_ok=True)
+    with open(args.log, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+    print(f"{args.module}: {best_total / 1000:.1f} ms (best of {args.runs})")
+    for name, cumulative in list(record['imports_us'].items())[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if previous is not None and previous.get('total_us'):
+        change = (best_total - previous['total_us']) / previous['total_us'] * 100
+        print(f"vs {previous.get('revision') or previous['timestamp']}: {change:+.1f}%")
+        if args.threshold is not None and change > args.threshold:
+            print(f"import time regressed by more than {args.threshold:.0f}%")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# One entry per monitoring chart, in dashboard order
+CHART_SPECS = (
+    dict(channel='voltage', name='Gerilim', color='#ff6b6b', fill=None,
+         title="AC Gerilim (V)", yaxis_title="Gerilim (V)",
+         hline=dict(y=230, line_dash="dash", line_color="gray", annotation_text="Nominal (230V)")),
+    dict(channel='frequency', name='Frekans', color='#4ecdc4', fill=None,
+         title="AC Frekans (Hz)", yaxis_title="Frekans (Hz)",
+         hline=dict(y=50, line_dash="dash", line_color="gray", annotation_text="Nominal (50Hz)")),
+    dict(channel='battery_soc', name='Batarya SoC', color='#45b7d1', fill='tonexty',
+         title="Batarya Şarj Durumu (%)", yaxis_title="SoC (%)",
+         hline=dict(y=20, line_dash="dash", line_color="red", annotation_text="Düşük SoC (20%)")),
+    dict(channel='pv_output', name='PV Çıkış', color='#f9ca24', fill='tozeroy',
+         title="PV Üretim (kW)", yaxis_title="Güç (kW)", hline=None),
+    dict(channel='load_demand', name='Yük Talebi', color='#e17055', fill='tozeroy',
+         title="Yük Talebi (kW)", yaxis_title="Güç (kW)", hline=None),
+    dict(channel='grid_power', name='Şebeke Gücü', color='#6c5ce7', fill=None,
+         title="Şebeke İthalat/İhracat (kW)", yaxis_title="Güç (kW)",
+         hline=dict(y=0, line_dash="dash", line_color="gray")),
+)
+
+# Charts of the optional three-phase channels, shown while history records them
+THREE_PHASE_CHART_SPECS = (
+    dict(channel='voltage_unbalance', name='Gerilim Dengesizliği', color='#a29bfe', fill=None,
+         title="Gerilim Dengesizliği (%)", yaxis_title="VUF (%)",
+         hline=dict(y=2, line_dash="dash", line_color="red", annotation_text="Sınır (2%)")),
+    dict(channel='neutral_current', name='Nötr Akımı', color='#00b894', fill='tozeroy',
+         title="Nötr Akımı (A)", yaxis_title="Akım (A)", hline=None),
+)
+
+
+def specs_for(channels):
+    # Chart specs of every channel in `channels`, in dashboard order
+    return tuple(spec for spec in CHART_SPECS + THREE_PHASE_CHART_SPECS if spec['channel'] in channels)
+
+
+def time_axis(times):
+    # Epoch milliseconds serialize as a binary typed array instead of one ISO
+    # string per point; the date-typed x-axis still renders them as timestamps
+    return times.astype('datetime64[ms]').astype(np.float64)
+
+
+def trace_data(history, channel, downsampler=None):
+    x = time_axis(history['time'])
+    y = history[channel]
+    if downsampler is None:
+        return x, y
+    indices = downsampler.indices(channel, x, y)
+    return x[indices], y[indices]
+
+
+def build_figure(spec):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines',
+        name=spec['name'],
+        line=dict(color=spec['color'], width=2),
+        fill=spec['fill']
+    ))
+    if spec['hline'] is not None:
+        fig.add_hline(**spec['hline'])
+    fig.update_layout(
+        title=spec['title'],
+        yaxis_title=spec['yaxis_title'],
+        xaxis_type='date',
+        # Streamlit applies its own theme in the browser, so shipping
+        # Plotly's default template with every refresh is dead weight
+        template='none',
+        height=250,
+        showlegend=False,
+        margin=dict(l=0, r=0, t=30, b=0)
+    )
+    return fig
+
+
+class ChartSet:
+    """Monitoring figures built once and refreshed by swapping trace data.
+
+    Layout, titles and reference lines are created a single time; each refresh
+    only replaces the x/y arrays of the existing traces. Long histories are
+    reduced by `downsampler` (see downsample.Downsampler) before plotting.
+    """
+
+    __slots__ = ('figures', 'specs', 'downsampler')
+
+    def __init__(self, downsampler=None, specs=CHART_SPECS):
+        self.figures = tuple(build_figure(spec) for spec in specs)
+        self.specs = specs
+        self.downsampler = downsampler
+
+    def update(self, history):
+        for fig, spec in zip(self.figures, self.specs):
+            trace = fig.data[0]
+            trace.x, trace.y = trace_data(history, spec['channel'], self.downsampler)
+        return self.figures
+
+
+class CombinedChart:
+    """All monitoring channels in one WebGL subplot figure with a shared time axis.
+
+    One figure means one serialization and one browser render per refresh,
+    and Scattergl keeps panning smooth with tens of thousands of points.
+    """
+
+    __slots__ = ('figure', 'specs', 'downsampler')
+
+    def __init__(self, cols=3, downsampler=None, specs=CHART_SPECS):
+        rows = -(-len(specs) // cols)
+        fig = make_subplots(
+            rows=rows,
+            cols=cols,
+            shared_xaxes='all',
+            vertical_spacing=0.12,
+            subplot_titles=[spec['title'] for spec in specs]
+        )
+        for i, spec in enumerate(specs):
+            row, col = i // cols + 1, i % cols + 1
+            fig.add_trace(go.Scattergl(
+                x=[],
+                y=[],
+                mode='lines',
+                name=spec['name'],
+                line=dict(color=spec['color'], width=2),
+                # 'tonexty' would fill towards the previous subplot's trace here
+                fill='tozeroy' if spec['fill'] else None
+            ), row=row, col=col)
+            if spec['hline'] is not None:
+                fig.add_hline(row=row, col=col, **spec['hline'])
+            fig.update_yaxes(title_text=spec['yaxis_title'], row=row, col=col)
+        fig.update_xaxes(type='date')
+        fig.update_layout(
+            template='none',
+            height=250 * rows + 60,
+            showlegend=False,
+            margin=dict(l=0, r=0, t=30, b=0)
+        )
+        self.figure = fig
+        self.specs = specs
+        self.downsampler = downsampler
+
+    def update(self, history):
+        with self.figure.batch_update():
+            for trace, spec in zip(self.figure.data, self.specs):
+                trace.x, trace.y = trace_data(history, spec['channel'], self.downsampler)
+        return self.figure
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+
+from ann_controller import WEIGHTS_PATH, MLPController
+
+LAYERS = ('secondary', 'tertiary')
+
+# Controller classes by layer and name, filled by @register
+REGISTRY = {layer: {} for layer in LAYERS}
+
+
+class Controller:
+    """Policy plugged into one control layer of an engine: `observe(state) -> action`.
+
+    Secondary controllers get the frequency and voltage (and their errors from
+    nominal) after primary droop, plus the physics step `dt`, and return the
+    (frequency, voltage) corrections to subtract. Tertiary controllers get the
+    battery SoC, PV, load, grid power, island mode and `dt`, and return the
+    change in grid power in kW; like the engines' grid power it is positive
+    towards export and negative towards import. A loop running slower than the physics has its
+    last action held and applied on every step until it runs again, so rates
+    scale with the physics `dt`, not with the loop period.
+
+    On a FleetEngine a `vectorized` controller gets one state of (n_sites,)
+    arrays and returns arrays; any other controller is called once per site,
+    in site order, with plain floats. Controllers may keep state, so each
+    engine gets its own instance.
+    """
+
+    name = None
+    layer = None
+    label = None
+    vectorized = False
+
+    @classmethod
+    def is_available(cls):
+        # False hides the controller from selection, e.g. while its weights are missing
+        return True
+
+    def observe(self, state):
+        raise NotImplementedError
+
+
+def register(cls):
+    # Class decorator; makes the controller selectable by (layer, name)
+    if cls.layer not in REGISTRY:
+        raise ValueError(f"unknown control layer: {cls.layer!r}")
+    REGISTRY[cls.layer][cls.name] = cls
+    return cls
+
+
+def available(layer):
+    return {name: cls.label or name for name, cls in REGISTRY[layer].items() if cls.is_available()}
+
+
+def create(layer, name, **kwargs):
+    try:
+        cls = REGISTRY[layer][name]
+    except KeyError:
+        raise KeyError(f"no {layer} controller named {name!r}") from None
+    return cls(**kwargs)
+
+
+@register
+class ProportionalSecondary(Controller):
+    """Corrects 20% of the error per second once it leaves the dead band."""
+
+    name = 'proportional'
+    layer = 'secondary'
+    label = 'Oransal'
+    vectorized = True
+
+    def observe(self, state):
+        # Works on floats and arrays alike; a False mask multiplies to 0.0
+        correction_factor = min(1.0, 0.2 * state['dt'])  # 5-second correction time
+        freq_error = state['frequency_error']
+        voltage_error = state['voltage_error']
+        return (
+            freq_error * correction_factor * (abs(freq_error) > 0.2),
+            voltage_error * correction_factor * (abs(voltage_error) > 5)
+        )
+
+
+@register
+class ANNSecondary(Controller):
+    """MLPController over a sliding window of errors, one batched inference per tick."""
+
+    name = 'ann'
+    layer = 'secondary'
+    label = 'YSA (MLP)'
+    vectorized = True
+
+    def __init__(self, path=WEIGHTS_PATH):
+        self.network = MLPController.load(path)
+        self.window = None
+
+    @classmethod
+    def is_available(cls):
+        return os.path.exists(WEIGHTS_PATH)
+
+    def observe(self, state):
+        freq_error = state['frequency_error']
+        batch_shape = getattr(freq_error, 'shape', ())
+        if self.window is None or self.window.shape[:-2] != batch_shape:
+            self.window = self.network.new_window(batch_shape)
+        errors = np.stack((freq_error, state['voltage_error']), axis=-1)
+        corrections = self.network.correct(self.window, errors, state['dt'])
+        return corrections[..., 0], corrections[..., 1]
+
+
+@register
+class RuleBasedTertiary(Controller):
+    """Trims grid import above 1 kW and imports more while SoC is below 20%."""
+
+    name = 'rule_based'
+    layer = 'tertiary'
+    label = 'Kural Tabanlı'
+    vectorized = True
+
+    def observe(self, state):
+        grid_power = state['grid_power']
+        dt = state['dt']
+        # Grid import optimization, 10-second optimization; import is negative grid power
+        adjustment = -grid_power * min(1.0, 0.02 * dt) * (grid_power < -1.0)
+        # Prioritize charging by increasing grid import
+        adjustment -= min(1.0, 0.5 * dt) * (state['battery_soc'] < 20) * (1 - state['island_mode'])
+        return adjustment
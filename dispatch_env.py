@@ -0,0 +1,153 @@
+"""Vectorized training environment for a tertiary dispatch policy.
+
+N microgrids advance together on a FleetEngine. At every step the policy sets
+each battery's power, and the environment scores the grid energy cost, how
+far SoC strays from its healthy band and how far frequency drifts from
+nominal. Observations, actions and rewards are (n_envs, ...) arrays, with
+the usual `reset()` / `step(action)` protocol; finished episodes are reset
+in place.
+
+    python dispatch_env.py --envs 4096 --steps 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from fleet_engine import FleetEngine
+from microgrid_engine import NOMINAL_FREQ, NOMINAL_VOLTAGE
+
+# Grid import tariff per hour of the day (currency/kWh); exports earn EXPORT_PRICE
+TARIFF = np.array([
+    0.10, 0.10, 0.10, 0.10, 0.10, 0.10, 0.15, 0.25, 0.25, 0.20, 0.20, 0.20,
+    0.20, 0.20, 0.20, 0.20, 0.25, 0.35, 0.35, 0.35, 0.25, 0.15, 0.10, 0.10,
+])
+EXPORT_PRICE = 0.05
+
+# SoC band (%) kept for battery health
+SOC_LOW = 20.0
+SOC_HIGH = 90.0
+
+# Battery power limit (kW) the action in [-1, 1] is scaled by
+MAX_BATTERY_POWER = 2.0
+
+OBSERVATIONS = (
+    'battery_soc', 'pv_output', 'load_demand', 'frequency_error', 'voltage_error',
+    'price', 'time_sin', 'time_cos', 'island_mode',
+)
+
+
+class DispatchEnv:
+    """Gym-style vectorized dispatch environment over NumPy arrays.
+
+    The action is one value per environment in [-1, 1], scaled to the battery
+    power setpoint (positive charging). `step()` returns `(observation,
+    reward, done, info)`; `info` holds the reward terms and, for environments
+    that just finished, their final observation under 'final_observation'.
+    """
+
+    observation_size = len(OBSERVATIONS)
+    action_size = 1
+
+    def __init__(self, n_envs, dt=60.0, episode_length=1440, cost_weight=1.0, soc_weight=1.0,
+                 frequency_weight=1.0, island_probability=0.0, secondary_ai=False, seed=None):
+        self.n_envs = n_envs
+        self.dt = dt
+        self.episode_length = episode_length
+        self.cost_weight = cost_weight
+        self.soc_weight = soc_weight
+        self.frequency_weight = frequency_weight
+        self.island_probability = island_probability
+        self.engine = FleetEngine(n_envs, seed=seed)
+        self.engine.secondary_ai_enabled[:] = secondary_ai
+        self.engine.tertiary_ai_enabled[:] = False  # The policy is the tertiary controller
+        self.time_of_day = np.zeros(n_envs)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+
+    def reset(self):
+        self._reset_envs(np.ones(self.n_envs, dtype=bool))
+        return self._observe()
+
+    def _reset_envs(self, mask):
+        # Random start: SoC within the healthy band, time of day and island mode
+        n = int(mask.sum())
+        engine = self.engine
+        engine.battery_soc[mask] = self._rng.uniform(SOC_LOW, SOC_HIGH, n)
+        engine.island_mode[mask] = self._rng.random(n) < self.island_probability
+        engine.frequency[mask] = NOMINAL_FREQ
+        engine.voltage[mask] = NOMINAL_VOLTAGE
+        self.time_of_day[mask] = self._rng.uniform(0.0, 86400.0, n)
+        self.steps[mask] = 0
+
+    def price(self):
+        return TARIFF[(self.time_of_day // 3600).astype(np.int64) % 24]
+
+    def _observe(self):
+        engine = self.engine
+        angle = self.time_of_day * (2 * np.pi / 86400.0)
+        return np.stack([
+            engine.battery_soc / 100.0,
+            engine.pv_output,
+            engine.load_demand,
+            engine.frequency - NOMINAL_FREQ,
+            (engine.voltage - NOMINAL_VOLTAGE) / 10.0,
+            self.price(),
+            np.sin(angle),
+            np.cos(angle),
+            engine.island_mode.astype(float),
+        ], axis=1).astype(np.float32)
+
+    def step(self, action):
+        engine = self.engine
+        setpoint = np.clip(np.asarray(action, dtype=float).reshape(self.n_envs), -1.0, 1.0) * MAX_BATTERY_POWER
+        price = self.price()
+        engine.step(self.dt, run_tertiary=False, battery_setpoint=setpoint)
+
+        # The engine's grid_power is the site's surplus; zero while islanded
+        energy_kwh = -engine.grid_power * (self.dt / 3600)
+        grid_cost = np.where(energy_kwh > 0, price, EXPORT_PRICE) * energy_kwh
+        soc = engine.battery_soc
+        soc_penalty = (np.maximum(SOC_LOW - soc, 0.0) + np.maximum(soc - SOC_HIGH, 0.0)) / 10.0
+        frequency_deviation = np.abs(engine.frequency - NOMINAL_FREQ)
+        reward = -(self.cost_weight * grid_cost
+                   + self.soc_weight * soc_penalty
+                   + self.frequency_weight * frequency_deviation)
+
+        self.time_of_day = (self.time_of_day + self.dt) % 86400.0
+        self.steps += 1
+        observation = self._observe()
+        done = self.steps >= self.episode_length
+        info = {'grid_cost': grid_cost, 'soc_penalty': soc_penalty, 'frequency_deviation': frequency_deviation}
+        if done.any():
+            info['final_observation'] = observation[done]
+            self._reset_envs(done)
+            observation[done] = self._observe()[done]
+        return observation, reward.astype(np.float32), done, info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--envs', type=int, default=4096, help="parallel environments")
+    parser.add_argument('--steps', type=int, default=1000, help="vectorized steps to time")
+    parser.add_argument('--dt', type=float, default=60.0, help="simulated seconds per step")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Throughput under a uniformly random policy
+    env = DispatchEnv(args.envs, dt=args.dt, seed=args.seed)
+    env.reset()
+    rng = np.random.default_rng(args.seed)
+    actions = rng.uniform(-1.0, 1.0, (args.steps, args.envs))
+    total_reward = 0.0
+    start = time.perf_counter()
+    for action in actions:
+        _, reward, _, _ = env.step(action)
+        total_reward += float(reward.sum())
+    elapsed = time.perf_counter() - start
+    print(f"{args.steps * args.envs / elapsed:,.0f} env steps/s "
+          f"({args.envs} envs, mean reward {total_reward / (args.steps * args.envs):.4f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Uniform noise per tick: PV (kW), load (kW), frequency (Hz), voltage (V)
+NOISE_LOW = np.array([-0.3, -0.5, -0.1, -3.0])
+NOISE_HIGH = np.array([0.3, 0.5, 0.1, 3.0])
+
+# Target number of random values drawn per block
+BLOCK_VALUES = 1 << 16
+
+
+class Disturbances:
+    """Seeded per-tick noise, pre-generated in vectorized blocks.
+
+    `next()` yields one (pv, load, frequency, voltage) row per tick: four
+    floats for a single site, or a (4, n_sites) array for a fleet. With
+    `record=True` every consumed row is kept on a tape that `from_tape()`
+    replays bit-exactly, regardless of seed or block size.
+    """
+
+    __slots__ = ('seed', 'n_sites', 'block_size', '_rng', '_block', '_pos', '_blocks', '_record')
+
+    def __init__(self, seed=None, n_sites=None, block_size=None, record=False):
+        width = NOISE_LOW.size * (n_sites or 1)
+        self.seed = seed
+        self.n_sites = n_sites
+        self.block_size = block_size or max(1, BLOCK_VALUES // width)
+        self._rng = np.random.default_rng(seed)
+        self._record = record
+        self._blocks = []
+        self._block = ()
+        self._pos = 0
+
+    @classmethod
+    def from_tape(cls, tape):
+        tape = np.asarray(tape, dtype=float)
+        disturbances = cls(n_sites=tape.shape[2] if tape.ndim == 3 else None, block_size=len(tape))
+        disturbances._rng = None
+        disturbances._block = disturbances._rows(tape)
+        return disturbances
+
+    def _rows(self, block):
+        # Python floats keep the scalar engine's arithmetic off NumPy scalars
+        return block.tolist() if self.n_sites is None else block
+
+    def _refill(self):
+        if self._rng is None:
+            raise IndexError("disturbance tape exhausted")
+        if self.n_sites is None:
+            block = self._rng.uniform(NOISE_LOW, NOISE_HIGH, size=(self.block_size, NOISE_LOW.size))
+        else:
+            size = (self.block_size, self.n_sites, NOISE_LOW.size)
+            block = self._rng.uniform(NOISE_LOW, NOISE_HIGH, size=size).transpose(0, 2, 1)
+        if self._record:
+            self._blocks.append(block)
+        self._block = self._rows(block)
+        self._pos = 0
+
+    def next(self):
+        if self._pos == len(self._block):
+            self._refill()
+        row = self._block[self._pos]
+        self._pos += 1
+        return row
+
+    @property
+    def tape(self):
+        # Rows consumed so far, shape (ticks, 4) or (ticks, 4, n_sites)
+        if not self._blocks:
+            return np.empty((0, NOISE_LOW.size) + ((self.n_sites,) if self.n_sites else ()))
+        blocks = self._blocks[:-1] + [self._blocks[-1][:self._pos]]
+        return np.concatenate(blocks)
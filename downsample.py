@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Horizontal pixels of one monitoring chart; M4 keeps at most 4 points per pixel
+CHART_WIDTH_PX = 600
+
+
+def m4_indices(x, y, width):
+    """Indices of the M4 aggregate of a series sorted by x.
+
+    The x range is split into `width` equal buckets (one per pixel column) and
+    each bucket keeps its first, last, minimum and maximum point, so the
+    rasterized line is identical to the full series, peaks and dips included.
+    """
+    n = len(y)
+    if n <= 4 * width:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    span = x[-1] - x[0]
+    buckets = np.minimum(((x - x[0]) * (width / span)).astype(np.int64), width - 1)
+    starts = np.flatnonzero(np.diff(buckets)) + 1
+    starts = np.concatenate(([0], starts))
+    ends = np.concatenate((starts[1:], [n])) - 1
+
+    # Bucket id of every point, then the first point matching each bucket's extreme
+    segment = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    extremes = []
+    for reduce in (np.minimum, np.maximum):
+        hits = np.flatnonzero(y == reduce.reduceat(y, starts)[segment])
+        extremes.append(hits[np.unique(segment[hits], return_index=True)[1]])
+
+    return np.unique(np.concatenate([starts, ends] + extremes))
+
+
+class Downsampler:
+    """M4 downsampling with a small LRU cache keyed by (channel, time window, width).
+
+    Safe to share between sessions; viewers of the shared simulation asking for
+    the same window reuse one computation.
+    """
+
+    def __init__(self, width=CHART_WIDTH_PX, maxsize=64):
+        self.width = width
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def indices(self, channel, x, y):
+        # slice(None) when the series already fits, so callers keep zero-copy views
+        if len(y) <= 4 * self.width:
+            return slice(None)
+
+        key = (channel, x[0], x[-1], len(x), self.width)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        indices = m4_indices(x, y, self.width)
+        with self._lock:
+            self._cache[key] = indices
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return indices
@@ -0,0 +1,139 @@
+import numpy as np
+
+from microgrid_engine import FREQ_RANGE, NOMINAL_FREQ, NOMINAL_VOLTAGE, VOLTAGE_RANGE
+
+# Default droop: full rated power for a 4% change in frequency or voltage
+DROOP_PERCENT = 4.0
+
+
+def share(demand, offset, gain, low, high):
+    """Solve sum(clip(offset + gain * shift, low, high)) = demand for a common shift.
+
+    Every argument broadcasts over leading batch dimensions, with units on the
+    last axis; gains must be positive. Batches where no unit reaches a limit
+    take the closed-form unconstrained shift; the rest go through
+    `_share_at_limits()`. Returns (shares, shift); the shift is +/-inf where
+    the demand is beyond what every unit at its limit can meet.
+    """
+    offset, gain, low, high = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (offset, gain, low, high))
+    )
+    batch_shape = offset.shape[:-1]
+    demand = np.broadcast_to(np.asarray(demand, dtype=float), batch_shape)
+
+    shift = (demand - offset.sum(axis=-1)) / gain.sum(axis=-1)
+    shares = offset + gain * shift[..., None]
+    limited = ((shares < low) | (shares > high)).any(axis=-1)
+    if limited.any():
+        n_units = offset.shape[-1]
+        shift = shift.reshape(-1)
+        rows = limited.reshape(-1)
+        shift[rows] = _share_at_limits(
+            demand.reshape(-1)[rows],
+            *(value.reshape(-1, n_units)[rows] for value in (offset, gain, low, high))
+        )
+        shift = shift.reshape(batch_shape)
+        shares = np.clip(offset + gain * shift[..., None], low, high)
+    return shares, shift
+
+
+def _share_at_limits(demand, offset, gain, low, high):
+    # Shift solving share() for (n_rows, n_units) inputs with units at their
+    # limits. The sum of shares is piecewise linear and non-decreasing in the
+    # shift, with breakpoints where a unit reaches a limit: sorting them and
+    # accumulating the slope in between finds the segment holding the demand.
+    breakpoints = np.concatenate(((low - offset) / gain, (high - offset) / gain), axis=-1)
+    order = np.argsort(breakpoints, axis=-1)
+    breakpoints = np.take_along_axis(breakpoints, order, axis=-1)
+    # Unit i adds gain_i to the slope from its low breakpoint to its high one
+    slope = np.cumsum(np.take_along_axis(np.concatenate((gain, -gain), axis=-1), order, axis=-1), axis=-1)
+
+    # Sum of shares minus demand at each breakpoint, starting from every unit at its low limit
+    rise = np.cumsum(slope[:, :-1] * np.diff(breakpoints, axis=-1), axis=-1)
+    residual = (low.sum(axis=-1) - demand)[:, None] + np.concatenate((np.zeros((len(rise), 1)), rise), axis=-1)
+
+    # The demand lies on the segment after the last breakpoint still short of it
+    rows = np.arange(len(breakpoints))
+    crossing = (residual < 0).sum(axis=-1)
+    segment = np.clip(crossing - 1, 0, breakpoints.shape[-1] - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shift = breakpoints[rows, segment] - residual[rows, segment] / slope[rows, segment]
+    shift = np.where(crossing == 0, np.where(residual[:, 0] > 0, -np.inf, breakpoints[:, 0]), shift)
+    return np.where(crossing == breakpoints.shape[-1], np.inf, shift)
+
+
+class InverterGroup:
+    """Inverter-based sources sharing a microgrid's load through P-f and Q-V droop.
+
+    Per-inverter parameters are (n_inverters,) arrays, or (n_sites,
+    n_inverters) for a FleetEngine. Inverter i follows
+
+        f = f0 - p_droop_i * (P_i - p_setpoint_i)
+        V_i = V0 - q_droop_i * (Q_i - q_setpoint_i)
+
+    and reaches the common bus through its own R/X line, so
+    V_common = V_i - (R_i P_i + X_i Q_i) / V0. With the demand balance this is
+    one linear system per site in the common frequency (or common voltage),
+    solved in closed form for every site at once; ratings cap P, and Q within
+    the capability left over by P. Where the demand is beyond every
+    inverter's limit there is no operating point: the frequency or voltage
+    runs off to the edge of the engines' operating range, low when short of
+    power and high when over, and `overloaded` flags the site.
+    """
+
+    def __init__(self, rating_kva, p_droop=None, q_droop=None, p_setpoint=0.0, q_setpoint=0.0,
+                 p_min=None, p_max=None, r_ohm=0.05, x_ohm=0.1):
+        self.rating_kva = np.asarray(rating_kva, dtype=float)
+        # Droop slopes in Hz/kW and V/kvar
+        self.p_droop = (DROOP_PERCENT / 100 * NOMINAL_FREQ / self.rating_kva
+                        if p_droop is None else np.asarray(p_droop, dtype=float))
+        self.q_droop = (DROOP_PERCENT / 100 * NOMINAL_VOLTAGE / self.rating_kva
+                        if q_droop is None else np.asarray(q_droop, dtype=float))
+        self.p_setpoint = np.asarray(p_setpoint, dtype=float)
+        self.q_setpoint = np.asarray(q_setpoint, dtype=float)
+        self.p_min = -self.rating_kva if p_min is None else np.asarray(p_min, dtype=float)
+        self.p_max = self.rating_kva if p_max is None else np.asarray(p_max, dtype=float)
+        self.r_ohm = np.asarray(r_ohm, dtype=float)
+        self.x_ohm = np.asarray(x_ohm, dtype=float)
+        # Outputs of the last share_load()
+        self.p = np.zeros(self.rating_kva.shape)
+        self.q = np.zeros(self.rating_kva.shape)
+        self.overloaded = np.zeros(self.rating_kva.shape[:-1], dtype=bool)
+
+    @classmethod
+    def random(cls, n_inverters, total_kva=10.0, n_sites=None, seed=None):
+        # Mixed ratings adding up to total_kva per site, on short random cables
+        rng = np.random.default_rng(seed)
+        shape = (n_inverters,) if n_sites is None else (n_sites, n_inverters)
+        rating = rng.uniform(0.5, 1.5, shape)
+        rating *= total_kva / rating.sum(axis=-1, keepdims=True)
+        r_ohm = rng.uniform(0.02, 0.1, shape)
+        return cls(rating, r_ohm=r_ohm, x_ohm=r_ohm * rng.uniform(1.0, 3.0, shape))
+
+    @property
+    def n_inverters(self):
+        return self.rating_kva.shape[-1]
+
+    def share_load(self, p_demand, q_demand):
+        # Splits the site demand (kW, kvar) between the inverters; returns the
+        # common frequency (Hz) and common-bus voltage (V)
+        p, shift = share(p_demand, self.p_setpoint, 1.0 / self.p_droop, self.p_min, self.p_max)
+        p_overloaded = np.isinf(shift)
+        frequency = NOMINAL_FREQ - shift
+        if p_overloaded.any():
+            frequency = np.where(p_overloaded, np.clip(frequency, *FREQ_RANGE), frequency)
+
+        # Q_i = a_i * (c_i - V_common); powers are in kW/kvar, hence the 1000 for volts
+        a = 1.0 / (self.q_droop + self.x_ohm * 1000 / NOMINAL_VOLTAGE)
+        c = NOMINAL_VOLTAGE + self.q_droop * self.q_setpoint - self.r_ohm * p * 1000 / NOMINAL_VOLTAGE
+        q_limit = np.sqrt(np.maximum(self.rating_kva ** 2 - p ** 2, 0.0))
+        q, shift = share(q_demand, a * c, a, -q_limit, q_limit)
+        q_overloaded = np.isinf(shift)
+        voltage = -shift
+        if q_overloaded.any():
+            voltage = np.where(q_overloaded, np.clip(voltage, *VOLTAGE_RANGE), voltage)
+
+        self.p = p
+        self.q = q
+        self.overloaded = p_overloaded | q_overloaded
+        return frequency, voltage
@@ -0,0 +1,195 @@
+import time
+
+import numpy as np
+
+from controllers import ProportionalSecondary, RuleBasedTertiary
+from disturbances import Disturbances
+from microgrid_engine import FREQ_RANGE, NOMINAL_FREQ, NOMINAL_VOLTAGE, REACTIVE_LOAD_RATIO, SCENARIOS, VOLTAGE_RANGE
+
+
+class FleetEngine:
+    """Many same-topology microgrids stepped together as (n_sites,) arrays.
+
+    Mirrors MicrogridEngine.step() branch for branch, with every Python `if`
+    turned into a boolean mask so a whole fleet advances in one call.
+    """
+
+    __slots__ = (
+        'n_sites',
+        'secondary_ai_enabled',
+        'tertiary_ai_enabled',
+        'island_mode',
+        'scenario_flags',
+        'battery_soc',
+        'voltage',
+        'frequency',
+        'pv_output',
+        'load_demand',
+        'grid_power',
+        'disturbances',
+        'secondary_controller',
+        'tertiary_controller',
+        'control_ns',
+        'secondary_output',
+        'tertiary_output',
+        'inverters',
+        'three_phase',
+        'battery',
+    )
+
+    def __init__(self, n_sites, battery_soc=80.0, voltage=NOMINAL_VOLTAGE, frequency=NOMINAL_FREQ,
+                 pv_output=3.0, load_demand=3.5, grid_power=0.5, seed=None, disturbances=None,
+                 secondary_controller=None, tertiary_controller=None, inverters=None,
+                 three_phase=None, battery=None):
+        self.n_sites = n_sites
+        self.secondary_ai_enabled = np.ones(n_sites, dtype=bool)
+        self.tertiary_ai_enabled = np.ones(n_sites, dtype=bool)
+        self.island_mode = np.zeros(n_sites, dtype=bool)
+        self.scenario_flags = {name: np.zeros(n_sites, dtype=bool) for name in SCENARIOS}
+        self.battery_soc = np.full(n_sites, battery_soc, dtype=float)
+        self.voltage = np.full(n_sites, voltage, dtype=float)
+        self.frequency = np.full(n_sites, frequency, dtype=float)
+        self.pv_output = np.full(n_sites, pv_output, dtype=float)
+        self.load_demand = np.full(n_sites, load_demand, dtype=float)
+        # Positive exports, negative imports, as in MicrogridEngine
+        self.grid_power = np.full(n_sites, grid_power, dtype=float)
+        self.disturbances = disturbances if disturbances is not None else Disturbances(seed, n_sites)
+        self.secondary_controller = secondary_controller or ProportionalSecondary()
+        self.tertiary_controller = tertiary_controller or RuleBasedTertiary()
+        self.control_ns = 0  # Running total of time spent in controllers, for profiling
+        # Held loop outputs, as in MicrogridEngine
+        self.secondary_output = (np.zeros(n_sites), np.zeros(n_sites))
+        self.tertiary_output = np.zeros(n_sites)
+        # Optional droop.InverterGroup with (n_sites, n_inverters) parameters
+        self.inverters = inverters
+        # Optional three_phase.ThreePhaseModel with (n_sites, 3) shares
+        self.three_phase = three_phase
+        # Optional battery.Battery with scalar or (n_sites,) parameters
+        self.battery = battery
+
+    def toggle_scenario(self, name, sites=slice(None)):
+        flags = self.scenario_flags[name]
+        flags[sites] = ~flags[sites]
+
+    @property
+    def battery_power(self):
+        # Positive while charging, negative while discharging
+        return self.pv_output - self.load_demand - self.grid_power
+
+    def snapshot(self, site):
+        snapshot = {
+            'voltage': float(self.voltage[site]),
+            'frequency': float(self.frequency[site]),
+            'battery_soc': float(self.battery_soc[site]),
+            'pv_output': float(self.pv_output[site]),
+            'load_demand': float(self.load_demand[site]),
+            'grid_power': float(self.grid_power[site]),
+        }
+        if self.three_phase is not None:
+            # Derived channels of the three-phase model; NaN until it has been solved
+            solved = self.three_phase.voltage_unbalance is not None
+            snapshot['voltage_unbalance'] = float(self.three_phase.voltage_unbalance[site]) if solved else np.nan
+            snapshot['neutral_current'] = float(self.three_phase.neutral_current[site]) if solved else np.nan
+        return snapshot
+
+    def _observe(self, controller, state):
+        # Vectorized controllers take the whole fleet; others go site by site
+        if controller.vectorized:
+            return controller.observe(state)
+        actions = [
+            controller.observe({key: value[site] if isinstance(value, np.ndarray) else value
+                                for key, value in state.items()})
+            for site in range(self.n_sites)
+        ]
+        return np.asarray(actions, dtype=float).T
+
+    def step(self, dt, run_secondary=True, run_tertiary=True, battery_setpoint=None):
+        # Loops that do not run hold their last output, as in MicrogridEngine.step().
+        # `battery_setpoint` (kW, positive charging) replaces the rule-based
+        # battery dispatch, within the same power and SoC limits (the
+        # battery model's own with self.battery set)
+        flags = self.scenario_flags
+        soc = self.battery_soc
+        pv_noise, load_noise, freq_noise, voltage_noise = self.disturbances.next()
+
+        # Base values with random fluctuations
+        pv = 3.0 + pv_noise
+        load = 3.5 + load_noise
+
+        # Apply scenario effects
+        pv[flags['pv_drop']] *= 0.3  # 70% drop
+        load += 1.5 * flags['load_ramp']  # Additional 1.5 kW
+        load += 2.0 * flags['peak_load']  # Peak surge
+
+        np.maximum(pv, 0, out=pv)
+        np.maximum(load, 0.5, out=load)
+
+        # Battery management
+        balance = pv - load
+        connected = ~flags['battery_disconnect']
+        request = balance if battery_setpoint is None else battery_setpoint
+        if self.battery is not None:
+            battery_power, soc[:] = self.battery.step(np.where(connected, request, 0.0), soc, dt)
+        else:
+            charging = connected & (request > 0)
+            discharging = connected & (request < 0) & (soc > 10)
+
+            # Charge/discharge power is at most 2 kW; both masks are disjoint
+            battery_power = np.where(charging, np.minimum(request, 2.0), 0.0)
+            battery_power -= np.where(discharging, np.minimum(-request, 2.0), 0.0)
+            soc_delta = battery_power * (dt / 3600 * 20)  # Simplified SoC calculation
+            soc_delta[charging & (soc >= 95)] = 0.0
+            soc += soc_delta
+            soc[connected] = np.clip(soc[connected], 0, 100)
+        balance -= battery_power
+
+        # Grid interaction
+        grid = np.where(flags['grid_blackout'] | self.island_mode, 0.0, balance)
+
+        # Primary Control (Droop) - Frequency and Voltage regulation
+        power_imbalance = pv + np.abs(grid) - load
+        if self.inverters is None:
+            frequency = NOMINAL_FREQ - power_imbalance * 0.05 + freq_noise
+            voltage = NOMINAL_VOLTAGE + voltage_noise
+        else:
+            # Every site's inverters share its deficit and reactive load in one batched solve
+            frequency, voltage = self.inverters.share_load(-power_imbalance, load * REACTIVE_LOAD_RATIO)
+            frequency += freq_noise
+            voltage += voltage_noise
+
+        # Secondary Control (pluggable, see controllers.py); controllers see
+        # every control tick and their held output acts only on enabled sites
+        control_start = time.perf_counter_ns()
+        if run_secondary:
+            self.secondary_output = self._observe(self.secondary_controller, {
+                'frequency': frequency,
+                'voltage': voltage,
+                'frequency_error': frequency - NOMINAL_FREQ,
+                'voltage_error': voltage - NOMINAL_VOLTAGE,
+                'dt': dt,
+            })
+        freq_correction, voltage_correction = self.secondary_output
+        frequency -= np.where(self.secondary_ai_enabled, freq_correction, 0.0)
+        voltage -= np.where(self.secondary_ai_enabled, voltage_correction, 0.0)
+
+        # Tertiary Control (pluggable)
+        if run_tertiary:
+            self.tertiary_output = self._observe(self.tertiary_controller, {
+                'battery_soc': soc,
+                'pv_output': pv,
+                'load_demand': load,
+                'grid_power': grid,
+                'island_mode': self.island_mode,
+                'dt': dt,
+            })
+        grid += np.where(self.tertiary_ai_enabled, self.tertiary_output, 0.0)
+        self.control_ns += time.perf_counter_ns() - control_start
+
+        # Clamp values to realistic ranges
+        self.frequency = np.clip(frequency, *FREQ_RANGE, out=frequency)
+        self.voltage = np.clip(voltage, *VOLTAGE_RANGE, out=voltage)
+        self.pv_output = pv
+        self.load_demand = load
+        self.grid_power = grid
+        if self.three_phase is not None:
+            self.three_phase.solve(load, pv, voltage)
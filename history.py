@@ -0,0 +1,204 @@
+import os
+
+import numpy as np
+
+CHANNELS = ('voltage', 'frequency', 'battery_soc', 'pv_output', 'load_demand', 'grid_power')
+
+# Optional channels, recorded while the three-phase model is switched on
+THREE_PHASE_CHANNELS = ('voltage_unbalance', 'neutral_current')
+
+
+# File header of a MemmapHistory, padded so records start page-aligned
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'), ('capacity', '<i8'), ('slots', '<i8'), ('count', '<i8'), ('channels', 'S256')
+])
+HEADER_SIZE = 4096
+MAGIC = b'MGHIST01'
+# Spare slots of a MemmapHistory past its capacity, as a fraction of it: the
+# appends a reader's view survives, and the headroom that keeps copy() whole
+# against a writer running flat out
+SPARE_FRACTION = 0.125
+
+
+def history_dtype(channels=CHANNELS):
+    return np.dtype([('time', 'datetime64[us]')] + [(name, np.float32) for name in channels])
+
+
+def convert_records(records, channels):
+    # Records laid out for `channels`; channels they lack are NaN
+    converted = np.full(len(records), np.nan, dtype=history_dtype(channels))
+    for name in converted.dtype.names:
+        if name in records.dtype.names:
+            converted[name] = records[name]
+    return converted
+
+
+class HistoryBuffer:
+    """Fixed-capacity telemetry ring buffer backed by a structured NumPy array.
+
+    Every record is written twice, at `i` and `i + capacity`, so the newest
+    `len(self)` records are always one contiguous slice. Appends are O(1) and
+    reads are zero-copy views in chronological order.
+    """
+
+    __slots__ = ('capacity', 'channels', '_data', '_head', '_size')
+
+    def __init__(self, capacity=50, channels=CHANNELS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.channels = tuple(channels)
+        self._data = np.zeros(2 * capacity, dtype=history_dtype(self.channels))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        # Ordered view of one channel, e.g. history['voltage']
+        return self.view()[name]
+
+    def view(self):
+        end = self._head + self.capacity
+        return self._data[end - self._size:end]
+
+    def append(self, timestamp, values):
+        row = (timestamp,) + tuple(values[name] for name in self.channels)
+        head = self._head
+        self._data[head] = row
+        self._data[head + self.capacity] = row
+        self._head = (head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def flush(self):
+        pass
+
+    def resize(self, capacity, channels=None):
+        # Keeps the newest records that fit in the new capacity; channels
+        # added are NaN in them, channels left out are dropped
+        channels = self.channels if channels is None else tuple(channels)
+        records = convert_records(self.view()[-capacity:], channels)
+        self.__init__(capacity, channels)
+        n = len(records)
+        self._data[:n] = records
+        self._data[capacity:capacity + n] = records
+        self._head = n % capacity
+        self._size = n
+
+
+class MemmapHistory(HistoryBuffer):
+    """HistoryBuffer kept in a memory-mapped file that outlives the process.
+
+    The header stores capacity, slot count, channel names and the total number
+    of records appended; the mirrored record layout follows it, with spare
+    slots past the capacity. A record is written before the count is bumped,
+    and a view never includes the spare slots the next appends write, so
+    readers in other processes, opened with `readonly=True`, can slice
+    straight from the page cache while the writer appends. A view is stable
+    for as many appends as there are spare slots; `copy()` never blocks the
+    writer or retries, and drops the oldest records if the writer reached
+    them while copying, so it can come back short but never torn. Re-opening
+    an existing file resumes where the writer stopped, with the layout and
+    channels recorded in its header.
+    """
+
+    __slots__ = ('path', 'readonly', '_header', '_slots')
+
+    def __init__(self, path, capacity=50, channels=CHANNELS, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            self._create(capacity, channels)
+        self._map()
+
+    def _create(self, capacity, channels):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        channels = tuple(channels)
+        slots = capacity + int(capacity * SPARE_FRACTION) + 1
+        with open(self.path, 'wb') as f:
+            f.truncate(HEADER_SIZE + 2 * slots * history_dtype(channels).itemsize)
+        header = np.memmap(self.path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+        header[0] = (MAGIC, capacity, slots, 0, ','.join(channels).encode())
+        header.flush()
+
+    def _map(self):
+        mode = 'r' if self.readonly else 'r+'
+        header = np.memmap(self.path, dtype=HEADER_DTYPE, mode=mode, shape=(1,))
+        if header['magic'][0] != MAGIC:
+            raise ValueError(f"{self.path} is not a history file")
+        self._header = header
+        self.capacity = int(header['capacity'][0])
+        self._slots = int(header['slots'][0])
+        self.channels = tuple(header['channels'][0].decode().split(','))
+        self._data = np.memmap(
+            self.path, dtype=history_dtype(self.channels), mode=mode,
+            offset=HEADER_SIZE, shape=(2 * self._slots,)
+        )
+
+    def __len__(self):
+        return min(int(self._header['count'][0]), self.capacity)
+
+    def _window(self, count):
+        # The newest records as of `count` appends; the spare slots the next
+        # appends write (and their mirrors) lie outside the window
+        size = min(count, self.capacity)
+        end = count % self._slots + self._slots
+        return self._data[end - size:end]
+
+    def view(self):
+        # Read the count once so the slice is consistent with a concurrent writer
+        return self._window(int(self._header['count'][0]))
+
+    def copy(self):
+        # Copy of view() without the records the writer may have overwritten
+        # meanwhile: while the count reads `written`, record `written` can be
+        # mid-write over record `written - slots`
+        count = int(self._header['count'][0])
+        records = np.array(self._window(count))
+        written = int(self._header['count'][0])
+        torn = written - self._slots + 1 - (count - len(records))
+        return records[max(torn, 0):]
+
+    def append(self, timestamp, values):
+        if self.readonly:
+            raise PermissionError(f"{self.path} is open read-only")
+        row = (timestamp,) + tuple(values[name] for name in self.channels)
+        count = int(self._header['count'][0])
+        head = count % self._slots
+        self._data[head] = row
+        self._data[head + self._slots] = row
+        self._header['count'] = count + 1
+
+    def clear(self):
+        self._header['count'] = 0
+
+    def flush(self):
+        if not self.readonly:
+            self._data.flush()
+            self._header.flush()
+
+    def resize(self, capacity, channels=None):
+        # Builds the resized file alongside and swaps it in, so readers still
+        # mapping the old file keep a stale but valid view until they reopen
+        channels = self.channels if channels is None else tuple(channels)
+        records = convert_records(self.view()[-capacity:], channels)
+        staging_path = self.path + '.resize'
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        resized = MemmapHistory(staging_path, capacity, channels)
+        n = len(records)
+        resized._data[:n] = records
+        resized._data[resized._slots:resized._slots + n] = records
+        resized._header['count'] = n
+        resized.flush()
+        os.replace(staging_path, self.path)
+        self._map()
@@ -0,0 +1,328 @@
+import math
+import time
+
+from controllers import ProportionalSecondary, RuleBasedTertiary
+from disturbances import Disturbances
+
+NOMINAL_FREQ = 50.0
+NOMINAL_VOLTAGE = 230.0
+
+# Operating range the reported frequency and voltage are clamped to
+FREQ_RANGE = (49.5, 50.5)
+VOLTAGE_RANGE = (220.0, 240.0)
+
+# Power factor (lagging) of the site load
+LOAD_POWER_FACTOR = 0.95
+REACTIVE_LOAD_RATIO = math.tan(math.acos(LOAD_POWER_FACTOR))
+
+SCENARIOS = ('load_ramp', 'pv_drop', 'battery_disconnect', 'grid_blackout', 'peak_load')
+
+
+class MicrogridEngine:
+    """Single-site microgrid physics with no Streamlit dependency."""
+
+    __slots__ = (
+        'secondary_ai_enabled',
+        'tertiary_ai_enabled',
+        'island_mode',
+        'scenario_flags',
+        'battery_soc',
+        'voltage',
+        'frequency',
+        'pv_output',
+        'load_demand',
+        'grid_power',
+        'disturbances',
+        'secondary_controller',
+        'tertiary_controller',
+        'control_ns',
+        'secondary_output',
+        'tertiary_output',
+        'network',
+        'inverters',
+        'three_phase',
+        'battery',
+    )
+
+    def __init__(self, battery_soc=80.0, voltage=NOMINAL_VOLTAGE, frequency=NOMINAL_FREQ,
+                 pv_output=3.0, load_demand=3.5, grid_power=0.5, seed=None, disturbances=None,
+                 secondary_controller=None, tertiary_controller=None, network=None,
+                 inverters=None, three_phase=None, battery=None):
+        self.secondary_ai_enabled = True
+        self.tertiary_ai_enabled = True
+        self.island_mode = False
+        self.scenario_flags = {name: False for name in SCENARIOS}
+        self.battery_soc = battery_soc
+        self.voltage = voltage
+        self.frequency = frequency
+        self.pv_output = pv_output
+        self.load_demand = load_demand
+        # Power exchanged with the main grid (kW): positive exports, negative imports
+        self.grid_power = grid_power
+        # Pass Disturbances.from_tape(...) to replay a recorded run
+        self.disturbances = disturbances if disturbances is not None else Disturbances(seed)
+        # Swappable at runtime; the defaults are the original rule-based controllers
+        self.secondary_controller = secondary_controller or ProportionalSecondary()
+        self.tertiary_controller = tertiary_controller or RuleBasedTertiary()
+        self.control_ns = 0  # Running total of time spent in controllers, for profiling
+        # Last (frequency, voltage) correction and grid adjustment of each
+        # loop, held until that loop runs again
+        self.secondary_output = (0.0, 0.0)
+        self.tertiary_output = 0.0
+        # Optional ac_network.Network; voltage and grid power then come from a load flow
+        self.network = network
+        # Optional droop.InverterGroup sharing the imbalance in place of the single droop line
+        self.inverters = inverters
+        # Optional three_phase.ThreePhaseModel resolving the load and PV per phase
+        self.three_phase = three_phase
+        # Optional battery.Battery in place of the fixed 2 kW / linear SoC model
+        self.battery = battery
+
+    def toggle_scenario(self, name):
+        self.scenario_flags[name] = not self.scenario_flags[name]
+
+    @property
+    def battery_power(self):
+        # Positive while charging, negative while discharging
+        return self.pv_output - self.load_demand - self.grid_power
+
+    def snapshot(self):
+        snapshot = {
+            'voltage': self.voltage,
+            'frequency': self.frequency,
+            'battery_soc': self.battery_soc,
+            'pv_output': self.pv_output,
+            'load_demand': self.load_demand,
+            'grid_power': self.grid_power,
+        }
+        if self.three_phase is not None:
+            # Derived channels of the three-phase model; NaN until it has been solved
+            solved = self.three_phase.voltage_unbalance is not None
+            snapshot['voltage_unbalance'] = float(self.three_phase.voltage_unbalance) if solved else math.nan
+            snapshot['neutral_current'] = float(self.three_phase.neutral_current) if solved else math.nan
+        return snapshot
+
+    def step(self, dt, run_secondary=True, run_tertiary=True):
+        # A control loop that does not run this step keeps applying the output
+        # of its last run (sample and hold); either way the outputs are
+        # per-step quantities scaled by the physics dt
+        flags = self.scenario_flags
+        pv_noise, load_noise, freq_noise, voltage_noise = self.disturbances.next()
+
+        # Base values with random fluctuations
+        base_pv = 3.0 + pv_noise
+        base_load = 3.5 + load_noise
+
+        # Apply scenario effects
+        if flags['pv_drop']:
+            base_pv *= 0.3  # 70% drop
+        if flags['load_ramp']:
+            base_load += 1.5  # Additional 1.5 kW
+        if flags['peak_load']:
+            base_load += 2.0  # Peak surge
+
+        pv_output = max(0, base_pv)
+        load_demand = max(0.5, base_load)
+        battery_soc = self.battery_soc
+
+        # Battery management
+        power_balance = pv_output - load_demand
+        if self.battery is not None:
+            # The pack takes what its C-rate and SoC limits allow; it idles (and
+            # its RC voltage relaxes) while disconnected
+            request = 0.0 if flags['battery_disconnect'] else power_balance
+            battery_power, battery_soc = self.battery.step(request, battery_soc, dt)
+            battery_soc = float(battery_soc)
+            power_balance -= float(battery_power)
+        elif not flags['battery_disconnect']:
+            if power_balance > 0:  # Excess power - charge battery
+                charge_power = min(power_balance, 2.0)  # Max 2kW charging
+                if battery_soc < 95:
+                    battery_soc += (charge_power * dt / 3600) * 20  # Simplified SoC calculation
+                power_balance -= charge_power
+            elif power_balance < 0 and battery_soc > 10:  # Discharge battery
+                discharge_power = min(abs(power_balance), 2.0)  # Max 2kW discharge
+                battery_soc -= (discharge_power * dt / 3600) * 20
+                power_balance += discharge_power
+
+            battery_soc = max(0, min(100, battery_soc))
+
+        # Grid interaction
+        if flags['grid_blackout'] or self.island_mode:
+            grid_power = 0
+        else:
+            grid_power = power_balance
+
+        # Network load flow; the PCC, or the battery inverter while islanded,
+        # balances the feeder including line losses
+        if self.network is not None:
+            network = self.network
+            islanded = flags['grid_blackout'] or self.island_mode
+            battery_charge = pv_output - load_demand - power_balance
+            try:
+                network.solve(network.injections(pv_output, load_demand, battery_charge), islanded)
+                network_voltage = float(network.bus_voltages()[network.monitor_bus])
+                if not islanded:
+                    grid_power = -float(network.slack_power().real)
+            except RuntimeError:
+                network_voltage = 0.0  # No solution: voltage collapse, clamped below
+
+        # Primary Control (Droop) - Frequency and Voltage regulation
+        power_imbalance = pv_output + abs(grid_power) - load_demand
+        if self.inverters is None:
+            freq_deviation = -power_imbalance * 0.05  # Droop coefficient
+            frequency = NOMINAL_FREQ + freq_deviation + freq_noise
+            droop_voltage = NOMINAL_VOLTAGE
+        else:
+            # The inverters pick up the deficit and the reactive load between them
+            frequency, droop_voltage = self.inverters.share_load(
+                -power_imbalance, load_demand * REACTIVE_LOAD_RATIO
+            )
+            frequency = float(frequency) + freq_noise
+            droop_voltage = float(droop_voltage)
+
+        # Voltage regulation
+        voltage = droop_voltage + voltage_noise if self.network is None else network_voltage
+
+        # Secondary Control (pluggable, see controllers.py); controllers see
+        # every control tick and their held output acts only while enabled
+        control_start = time.perf_counter_ns()
+        if run_secondary:
+            freq_correction, voltage_correction = self.secondary_controller.observe({
+                'frequency': frequency,
+                'voltage': voltage,
+                'frequency_error': frequency - NOMINAL_FREQ,
+                'voltage_error': voltage - NOMINAL_VOLTAGE,
+                'dt': dt,
+            })
+            self.secondary_output = (float(freq_correction), float(voltage_correction))
+        if self.secondary_ai_enabled:
+            frequency -= self.secondary_output[0]
+            voltage -= self.secondary_output[1]
+
+        # Tertiary Control (pluggable)
+        if run_tertiary:
+            self.tertiary_output = float(self.tertiary_controller.observe({
+                'battery_soc': battery_soc,
+                'pv_output': pv_output,
+                'load_demand': load_demand,
+                'grid_power': grid_power,
+                'island_mode': self.island_mode,
+                'dt': dt,
+            }))
+        if self.tertiary_ai_enabled:
+            grid_power += self.tertiary_output
+        self.control_ns += time.perf_counter_ns() - control_start
+
+        # Clamp values to realistic ranges
+        self.frequency = max(FREQ_RANGE[0], min(FREQ_RANGE[1], frequency))
+        self.voltage = max(VOLTAGE_RANGE[0], min(VOLTAGE_RANGE[1], voltage))
+        self.pv_output = pv_output
+        self.load_demand = load_demand
+        self.battery_soc = battery_soc
+        self.grid_power = grid_power
+        if self.three_phase is not None:
+            self.three_phase.solve(load_demand, pv_output, self.voltage)
+
+
+class SimulatedClock:
+    """Fixed-step multi-rate clock that advances an engine as fast as the CPU allows.
+
+    Physics runs every `dt`; the secondary and tertiary control loops run every
+    `secondary_period` / `tertiary_period` simulated seconds (rounded to whole
+    physics steps, None meaning every step); in between, the engine holds each
+    loop's last output. `advance()` can be fed arbitrary
+    durations: time that does not fill a whole step carries over to the next call.
+
+    With a `profiler` attached, every `advance()` records its total time spent
+    in physics, control and `on_step` as the 'physics', 'control' and 'history'
+    spans.
+    """
+
+    __slots__ = (
+        'engine',
+        'dt',
+        'secondary_period',
+        'tertiary_period',
+        'sim_time',
+        'steps',
+        'wall_time',
+        'last_speed',
+        'profiler',
+        '_backlog',
+    )
+
+    def __init__(self, engine, dt=1.0, secondary_period=None, tertiary_period=None, profiler=None):
+        self.engine = engine
+        self.dt = dt
+        self.secondary_period = secondary_period
+        self.tertiary_period = tertiary_period
+        self.sim_time = 0.0
+        self.steps = 0
+        self.wall_time = 0.0
+        self.last_speed = 0.0
+        self.profiler = profiler
+        self._backlog = 0.0
+
+    @property
+    def backlog(self):
+        # Simulated seconds requested from advance() but not yet stepped
+        return self._backlog
+
+    @property
+    def speed(self):
+        # Achieved simulated seconds per wall second since the clock started
+        return self.sim_time / self.wall_time if self.wall_time > 0 else 0.0
+
+    def _every(self, period):
+        return max(1, int(round(period / self.dt))) if period else 1
+
+    def advance(self, duration=None, wall_budget=None, on_step=None):
+        # Stops after `duration` simulated seconds or `wall_budget` wall seconds,
+        # whichever comes first; returns the number of steps taken
+        if duration is None and wall_budget is None:
+            raise ValueError("advance() needs a duration or a wall_budget")
+
+        dt = self.dt
+        step = self.engine.step
+        secondary_every = self._every(self.secondary_period)
+        tertiary_every = self._every(self.tertiary_period)
+        max_steps = None
+        if duration is not None:
+            self._backlog += duration
+            max_steps = int(self._backlog / dt + 1e-9)
+        timed = self.profiler is not None
+        history_ns = 0
+        control_start = self.engine.control_ns
+        start = time.perf_counter()
+        deadline = start + wall_budget if wall_budget is not None else None
+        steps = 0
+
+        while max_steps is None or steps < max_steps:
+            self.steps += 1
+            step(dt, self.steps % secondary_every == 0, self.steps % tertiary_every == 0)
+            steps += 1
+            self.sim_time += dt
+            if on_step is not None:
+                if timed:
+                    on_step_start = time.perf_counter_ns()
+                    on_step(self.sim_time)
+                    history_ns += time.perf_counter_ns() - on_step_start
+                else:
+                    on_step(self.sim_time)
+            # Checking the deadline every step would dominate the loop cost
+            if deadline is not None and steps % 64 == 0 and time.perf_counter() >= deadline:
+                break
+
+        if duration is not None:
+            self._backlog = max(0.0, self._backlog - steps * dt)
+        elapsed = time.perf_counter() - start
+        self.wall_time += elapsed
+        self.last_speed = steps * dt / elapsed if elapsed > 0 else 0.0
+        if timed:
+            control_ns = self.engine.control_ns - control_start
+            self.profiler.record('physics', int(elapsed * 1e9) - history_ns - control_ns)
+            self.profiler.record('control', control_ns)
+            if on_step is not None:
+                self.profiler.record('history', history_ns)
+        return steps
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Samples kept per span; older ones are overwritten
+WINDOW = 2048
+
+# Histogram bins, log-spaced from 1 us to 10 s
+HISTOGRAM_EDGES_NS = np.logspace(3, 10, 29)
+
+
+class SpanStats:
+    """Rolling window of the most recent durations (ns) of one span."""
+
+    __slots__ = ('samples', 'count', 'total_ns')
+
+    def __init__(self, window=WINDOW):
+        self.samples = np.zeros(window, dtype=np.int64)
+        self.count = 0  # Lifetime count; the window holds the newest min(count, window)
+        self.total_ns = 0
+
+    def add(self, ns):
+        self.samples[self.count % len(self.samples)] = ns
+        self.count += 1
+        self.total_ns += ns
+
+    def recent(self):
+        return self.samples[:min(self.count, len(self.samples))].copy()
+
+
+class Profiler:
+    """perf_counter_ns spans aggregated into per-name rolling windows.
+
+    `span(name)` times a block; `record(name, ns)` adds a duration measured
+    elsewhere, e.g. a total accumulated over a batch of steps. Recording takes
+    a lock, so spans may come from the simulation worker and every session at
+    once. A disabled profiler hands out a no-op span.
+    """
+
+    def __init__(self, window=WINDOW, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self.started = time.time()
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, ns):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats(self.window)
+            stats.add(ns)
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def names(self):
+        with self._lock:
+            return sorted(self._spans)
+
+    def _recent(self, name):
+        with self._lock:
+            stats = self._spans[name]
+            return stats.recent(), stats.count, stats.total_ns
+
+    def summary(self):
+        # Per-span statistics over the rolling window, in milliseconds
+        rows = {}
+        for name in self.names():
+            samples, count, total_ns = self._recent(name)
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99)) / 1e6
+            rows[name] = {
+                'count': count,
+                'mean_ms': float(samples.mean() / 1e6),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(samples.max() / 1e6),
+                'total_s': total_ns / 1e9,
+            }
+        return rows
+
+    def histogram(self, name):
+        # Counts over HISTOGRAM_EDGES_NS for the rolling window of one span
+        samples = self._recent(name)[0]
+        return np.histogram(np.clip(samples, HISTOGRAM_EDGES_NS[0], HISTOGRAM_EDGES_NS[-1]), HISTOGRAM_EDGES_NS)[0]
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+        self.started = time.time()
+
+    def to_json(self, **context):
+        # Summary plus histograms; `context` adds fields such as the history size
+        return json.dumps({
+            'started': self.started,
+            'exported': time.time(),
+            'context': context,
+            'histogram_edges_ns': HISTOGRAM_EDGES_NS.tolist(),
+            'spans': {
+                name: dict(stats, histogram=self.histogram(name).tolist())
+                for name, stats in self.summary().items()
+            },
+        }, indent=2)
+
+
+# Process-wide profiler shared by the simulation worker and every session
+PROFILER = Profiler()
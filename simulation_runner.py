@@ -0,0 +1,286 @@
+import atexit
+import datetime
+import queue
+import threading
+import time
+import traceback
+import weakref
+
+from battery import Battery
+from controllers import create as create_controller
+from droop import InverterGroup
+from history import THREE_PHASE_CHANNELS
+from microgrid_engine import SimulatedClock
+from telemetry_store import TelemetryStore
+from three_phase import ThreePhaseModel
+
+# Wall-clock seconds between real-time worker ticks; each tick steps the
+# physics in substeps of clock.dt to cover the wall time since the last one
+TICK_PERIOD = 1.0
+
+# Control actions that retune the multi-rate clock
+CLOCK_SETTINGS = ('dt', 'secondary_period', 'tertiary_period')
+
+# Buses of the feeder model switched in by the 'network' command
+NETWORK_BUSES = 200
+
+# Droop-controlled inverters switched in by the 'inverters' command
+INVERTER_COUNT = 100
+
+# Control actions that hot-swap an engine controller by registered name
+CONTROLLER_SLOTS = {'secondary_controller': 'secondary', 'tertiary_controller': 'tertiary'}
+
+# Wall-clock seconds stepped per batch in simulated clock mode; short enough
+# that readers never wait long on the history lock
+SIM_BATCH_BUDGET = 0.05
+
+
+def _worker(runner_ref, wake):
+    # Holds the runner only weakly between ticks so the thread ends once its
+    # owner (a session, or the process-wide cache) drops the runner
+    while True:
+        runner = runner_ref()
+        if runner is None or runner._stopped:
+            return
+        wake.clear()
+        try:
+            delay = runner._tick()
+        except Exception as exc:
+            # Pauses the shared simulation instead of ending its only worker
+            delay = runner._fail(exc)
+        del runner
+        # Submitted commands cut the wait short
+        wake.wait(delay)
+
+
+def _stop_at_exit(runner_ref):
+    # Daemon threads still running native extension code (e.g. scipy's sparse
+    # LU) during interpreter teardown can crash it; end the worker first
+    runner = runner_ref()
+    if runner is not None:
+        runner.stop()
+
+
+class CommandDone(threading.Event):
+    """Set once the worker has handled a submitted command; `error` holds the exception it raised, if any."""
+
+    def __init__(self):
+        super().__init__()
+        self.error = None
+
+
+class SimulationRunner:
+    """Advances a MicrogridEngine on a background thread.
+
+    Physics, secondary control and tertiary control run at the rates of the
+    runner's SimulatedClock; every physics substep is recorded to history, so
+    viewers see fast dynamics at whatever rate they redraw.
+
+    The worker publishes a fresh `snapshot` dict after every tick by swapping a
+    single reference, so readers get a consistent view without locking. History
+    is shared with the worker and read through `history_view()`.
+
+    Readers treat the runner as read-only; every control action goes through
+    `submit()` and is applied by the worker in arrival order, so concurrent
+    viewers of a shared runner cannot interleave half-applied changes.
+
+    Real-time samples are stamped in wall time; simulated ones run ahead of
+    it from the moment simulated mode was switched on. The two timelines
+    never share a history: switching clock mode clears it, and telemetry only
+    records real-time samples, so the store's day partitions stay in wall
+    time. A
+    command that raises is reported back through its CommandDone; a tick
+    that raises stops the simulation and leaves the message in `error`, and
+    the worker carries on serving commands either way.
+    """
+
+    def __init__(self, engine, history, period=TICK_PERIOD, profiler=None):
+        self.engine = engine
+        self.history = history
+        self.clock = SimulatedClock(engine, profiler=profiler)
+        self.period = period
+        self.running = False
+        self.simulated = False
+        self.error = None  # Why the last tick failed, until the simulation is started again
+        self.sim_start = datetime.datetime.now()
+        # Timestamp of simulated second 0, re-anchored on every clock-mode switch
+        self._time_origin = self.sim_start
+        if len(history) and history.view()['time'][-1].item() > self.sim_start:
+            # Left by a simulated run, stamped ahead of the wall clock; the
+            # runner starts in real time, which must not continue from it
+            history.clear()
+        self.store = None  # Optional TelemetryStore fed alongside history
+        self.snapshot = self._make_snapshot()
+        self._lock = threading.Lock()
+        self._sync_channels()
+        self._commands = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self._last_tick = time.time()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=_worker, args=(weakref.ref(self), self._wake), name='microgrid-sim', daemon=True
+        )
+        self._thread.start()
+        atexit.register(_stop_at_exit, weakref.ref(self))
+
+    def _make_snapshot(self):
+        snapshot = self.engine.snapshot()
+        snapshot['battery_power'] = self.engine.battery_power
+        snapshot['sim_speed'] = self.clock.last_speed
+        battery = self.engine.battery
+        if battery is not None and battery.current is not None:
+            snapshot['battery_voltage'] = float(battery.terminal_voltage)
+            snapshot['battery_current'] = float(battery.current)
+        three_phase = self.engine.three_phase
+        if three_phase is not None and three_phase.phase_voltage is not None:
+            snapshot['phase_voltage'] = three_phase.phase_voltage.tolist()
+            snapshot['phase_current'] = three_phase.phase_current.tolist()
+        return snapshot
+
+    def _append(self, timestamp):
+        values = self.engine.snapshot()
+        self.history.append(timestamp, values)
+        if self.store is not None and not self.simulated:
+            self.store.append(timestamp, values)
+
+    def _record(self, sim_time):
+        self._append(self._time_origin + datetime.timedelta(seconds=sim_time))
+
+    def _set_store(self, root):
+        # The old store is dropped even if writing out its last rows fails
+        store, self.store = self.store, None
+        if store is not None:
+            store.close()
+        self.store = TelemetryStore(root, self.history.channels) if root else None
+
+    def _sync_channels(self):
+        # History and telemetry carry the three-phase channels while the model is on
+        base = tuple(name for name in self.history.channels if name not in THREE_PHASE_CHANNELS)
+        channels = base + THREE_PHASE_CHANNELS if self.engine.three_phase is not None else base
+        if channels == self.history.channels:
+            return
+        with self._lock:
+            self.history.resize(self.history.capacity, channels)
+        if self.store is not None:
+            self._set_store(self.store.root)
+
+    def _switch_clock_mode(self, simulated):
+        # Starts the new timeline at the last tick, where a real-time tick
+        # would anchor it anyway
+        with self._lock:
+            self.history.clear()
+            self.simulated = simulated
+            self._time_origin = (datetime.datetime.fromtimestamp(self._last_tick)
+                                 - datetime.timedelta(seconds=self.clock.sim_time + self.clock.backlog))
+
+    def _fail(self, exc):
+        traceback.print_exception(exc)
+        self.running = False
+        self.error = f"{type(exc).__name__}: {exc}"
+        self._last_tick = time.time()
+        return self.period
+
+    def _apply_commands(self):
+        while True:
+            try:
+                name, value, done = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._apply_command(name, value)
+            except Exception as exc:
+                done.error = exc
+            finally:
+                done.set()
+
+    def _apply_command(self, name, value):
+        if name == 'toggle_scenario':
+            self.engine.toggle_scenario(value)
+        elif name == 'resize_history':
+            with self._lock:
+                self.history.resize(value)
+        elif name in CLOCK_SETTINGS:
+            setattr(self.clock, name, value)
+        elif name in CONTROLLER_SLOTS:
+            # Takes effect from the next step; the new controller starts fresh
+            setattr(self.engine, name, create_controller(CONTROLLER_SLOTS[name], value))
+        elif name == 'network':
+            # scipy is only loaded once the network model is switched on
+            from ac_network import radial_feeder
+            self.engine.network = radial_feeder(NETWORK_BUSES) if value else None
+        elif name == 'inverters':
+            self.engine.inverters = InverterGroup.random(INVERTER_COUNT) if value else None
+        elif name == 'battery':
+            self.engine.battery = Battery() if value else None
+        elif name == 'three_phase':
+            self.engine.three_phase = ThreePhaseModel.random() if value else None
+            self._sync_channels()
+        elif name == 'telemetry':
+            self._set_store(value)
+        elif name == 'simulated':
+            if value != self.simulated:
+                self._switch_clock_mode(value)
+        elif name == 'running':
+            self.running = value
+            if value:
+                self.error = None
+        else:
+            setattr(self.engine, name, value)
+
+    def _tick(self):
+        self._apply_commands()
+        current_time = time.time()
+        elapsed = current_time - self._last_tick
+
+        if not self.running:
+            self.history.flush()
+            if self.store is not None:
+                self.store.flush()
+            self._last_tick = current_time
+            return self.period
+        if not self.simulated and elapsed < self.period:
+            # Woken early by a command; keep the physics cadence
+            return self.period - elapsed
+        self._last_tick = current_time
+        tick_start = time.perf_counter_ns()
+
+        with self._lock:
+            if self.simulated:
+                # Fixed simulated timestep, stepped as fast as the CPU allows;
+                # timestamps run ahead of the wall clock
+                self.clock.advance(wall_budget=SIM_BATCH_BUDGET, on_step=self._record)
+            else:
+                # Substeps catch up with the wall clock, timestamped in wall
+                # time; never earlier than the last sample if the clock steps back
+                wall_origin = (datetime.datetime.fromtimestamp(current_time)
+                               - datetime.timedelta(seconds=self.clock.sim_time + self.clock.backlog + elapsed))
+                self._time_origin = max(self._time_origin, wall_origin)
+                self.clock.advance(duration=elapsed, on_step=self._record)
+        self.snapshot = self._make_snapshot()
+        if self.clock.profiler is not None:
+            self.clock.profiler.record('tick', time.perf_counter_ns() - tick_start)
+
+        if self.simulated:
+            return 0.0
+        return max(0.0, self.period - (time.time() - current_time))
+
+    def submit(self, name, value):
+        # Returns a CommandDone that is set once the worker has handled the command
+        done = CommandDone()
+        self._commands.put((name, value, done))
+        self._wake.set()
+        return done
+
+    def history_view(self):
+        # Copy under the lock; the worker may overwrite the oldest record mid-read
+        with self._lock:
+            return self.history.view().copy()
+
+    def stop(self):
+        # Ends the worker, then writes out the telemetry still staged in memory
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        with self._lock:
+            self._set_store(None)
@@ -0,0 +1,141 @@
+import importlib.util
+import os
+import uuid
+
+import numpy as np
+
+from history import CHANNELS, history_dtype
+
+# pyarrow is optional and slow to import, so it is only loaded once a store is used
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+# Seconds of records (by their timestamps) staged in memory and written out
+# together as one complete Parquet file; a few hundred files a day at most,
+# however fast the physics steps
+FLUSH_PERIOD = 300.0
+
+# Rows per Parquet row group, and the staging buffer's initial size
+ROW_GROUP_SIZE = 3600
+
+# Staged rows that force a flush before FLUSH_PERIOD is reached, bounding memory
+MAX_STAGED_ROWS = 1_000_000
+
+
+class TelemetryStore:
+    """Long-term history on disk as day-partitioned Parquet files.
+
+    Layout is `<root>/date=YYYY-MM-DD/part-<id>.parquet`. Records are staged
+    in a structured array, grown as needed, until they span `flush_period`
+    seconds; every flush writes them out as complete files of
+    `row_group_size` row groups, one file per day touched. A file is written
+    under a dot-name (which readers skip) and renamed into place once its
+    footer is on disk, so `read()` works while recording and a crash loses
+    at most the staged rows. `append()` mirrors HistoryBuffer.append() so the
+    two can be fed side by side.
+    """
+
+    def __init__(self, root, channels=CHANNELS, row_group_size=ROW_GROUP_SIZE, flush_period=FLUSH_PERIOD,
+                 max_rows=MAX_STAGED_ROWS):
+        if not HAVE_PYARROW:
+            raise ImportError("TelemetryStore needs pyarrow: pip install pyarrow")
+        import pyarrow as pa
+
+        self.root = root
+        self.channels = tuple(channels)
+        self.row_group_size = row_group_size
+        self.flush_period = flush_period
+        self.max_rows = max_rows
+        self.schema = pa.schema(
+            [('time', pa.timestamp('us'))] + [(name, pa.float32()) for name in self.channels]
+        )
+        self._set_staging(np.zeros(min(row_group_size, max_rows), dtype=history_dtype(self.channels)))
+        self._size = 0
+        self._flush_at = None  # Timestamp (us) from which a record starts the next file
+
+    def _set_staging(self, staging):
+        self._staging = staging
+        # Timestamps as integer microseconds; comparing those is an order
+        # faster than comparing datetime64 scalars
+        self._times = staging['time'].view(np.int64)
+
+    def append(self, timestamp, values):
+        size = self._size
+        if size == len(self._staging):
+            if size == self.max_rows:
+                self.flush()
+                size = 0
+            else:
+                grown = np.zeros(min(2 * size, self.max_rows), dtype=self._staging.dtype)
+                grown[:size] = self._staging
+                self._set_staging(grown)
+        staging = self._staging
+        staging[size] = (timestamp,) + tuple(values[name] for name in self.channels)
+        if size and self._times.item(size) >= self._flush_at:
+            # The new record starts the next file
+            self._write(staging[:size])
+            staging[0] = staging[size]
+            size = 0
+        if size == 0:
+            self._flush_at = self._times.item(0) + int(self.flush_period * 1e6)
+        self._size = size + 1
+
+    def extend(self, records):
+        # Bulk append of a structured array with the history dtype
+        self.flush()
+        self._write(records)
+
+    def flush(self):
+        if self._size:
+            self._write(self._staging[:self._size])
+            self._size = 0
+
+    def close(self):
+        self.flush()
+
+    def _write(self, records):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Records are chronological, so each day is one contiguous run
+        days = records['time'].astype('datetime64[D]')
+        bounds = np.flatnonzero(days[1:] != days[:-1]) + 1
+        for chunk in np.split(records, bounds):
+            directory = os.path.join(self.root, f"date={chunk['time'][0].astype('datetime64[D]')}")
+            os.makedirs(directory, exist_ok=True)
+            filename = f"part-{uuid.uuid4().hex}.parquet"
+            staging_path = os.path.join(directory, '.' + filename)
+            pq.write_table(
+                pa.Table.from_arrays([pa.array(chunk[name]) for name in self.schema.names], schema=self.schema),
+                staging_path,
+                row_group_size=self.row_group_size
+            )
+            os.replace(staging_path, os.path.join(directory, filename))
+
+    def read(self, start=None, end=None, columns=None):
+        # Returns a pandas DataFrame sorted by time for start <= time < end.
+        # Day partitions outside the range are skipped without being opened,
+        # and the time predicate is pushed down to row-group statistics.
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(self.root):
+            return self.schema.empty_table().to_pandas()
+        dataset = ds.dataset(
+            self.root,
+            format='parquet',
+            schema=self.schema.append(pa.field('date', pa.string())),
+            partitioning='hive'
+        )
+        predicate = None
+        if start is not None:
+            start = np.datetime64(start, 'us')
+            predicate = ((ds.field('date') >= str(start.astype('datetime64[D]')))
+                         & (ds.field('time') >= pa.scalar(start.item(), pa.timestamp('us'))))
+        if end is not None:
+            end = np.datetime64(end, 'us')
+            clause = ((ds.field('date') <= str(end.astype('datetime64[D]')))
+                      & (ds.field('time') < pa.scalar(end.item(), pa.timestamp('us'))))
+            predicate = clause if predicate is None else predicate & clause
+        columns = ['time'] + [name for name in (columns or self.channels) if name != 'time']
+        table = dataset.to_table(columns=columns, filter=predicate)
+        return table.sort_by('time').to_pandas()
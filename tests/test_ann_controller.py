@@ -0,0 +1,27 @@
+import unittest
+
+import numpy as np
+
+from ann_controller import TEACHER_DEADBAND, TEACHER_GAIN, MLPController, sample_windows, teacher_rates
+
+
+class ShippedWeightsTest(unittest.TestCase):
+
+    def test_shipped_weights_follow_the_teacher_dead_band(self):
+        network = MLPController.load()
+        errors = sample_windows(20000, seed=1, edge_fraction=0.0)
+        distance = np.abs(np.abs(errors[:, -1, :]) - TEACHER_DEADBAND)
+        away = distance > 0.1 * TEACHER_DEADBAND
+        # Error relative to the jump the rule makes at each dead-band edge
+        mismatch = np.abs(network(errors) - teacher_rates(errors)) / (TEACHER_GAIN * TEACHER_DEADBAND)
+        for channel in range(2):
+            self.assertLess(mismatch[away[:, channel], channel].mean(), 0.05)
+            self.assertLess(mismatch[away[:, channel], channel].max(), 0.25)
+
+        inside = np.zeros((1, network.window, 2))
+        inside[..., :] = 0.5 * TEACHER_DEADBAND
+        self.assertTrue(np.all(np.abs(network(inside)) < 0.1 * TEACHER_GAIN * TEACHER_DEADBAND))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from disturbances import Disturbances
+from fleet_engine import FleetEngine
+from microgrid_engine import MicrogridEngine, SimulatedClock
+
+
+def run(engine, duration, **periods):
+    grid_power = []
+    SimulatedClock(engine, dt=1.0, **periods).advance(
+        duration=duration, on_step=lambda sim_time: grid_power.append(engine.grid_power)
+    )
+    return np.array(grid_power)
+
+
+class HeldLoopOutputTest(unittest.TestCase):
+
+    def test_slow_tertiary_loop_matches_every_step_loop(self):
+        # Low SoC: the tertiary loop keeps asking for 0.5 kW of extra import
+        every_step = run(MicrogridEngine(seed=0, battery_soc=15), 900)
+        slow = run(MicrogridEngine(seed=0, battery_soc=15), 900, tertiary_period=300)
+        self.assertLess(slow.max(), 5.0)
+        self.assertAlmostEqual(np.median(slow), np.median(every_step), places=6)
+
+    def test_slow_secondary_loop_corrects_every_step(self):
+        # Voltage well outside the dead band on every step, corrected between ticks too
+        engine = MicrogridEngine(seed=0, disturbances=Disturbances.from_tape(np.tile([0.0, 0.0, 0.0, 8.0], (100, 1))))
+        voltages = []
+        SimulatedClock(engine, dt=1.0, secondary_period=5.0).advance(
+            duration=100, on_step=lambda sim_time: voltages.append(engine.voltage)
+        )
+        self.assertTrue(all(voltage < 238.0 for voltage in voltages[5:]))
+
+    def test_fleet_holds_outputs_like_scalar_engine(self):
+        n_sites = 8
+        fleet = FleetEngine(n_sites, battery_soc=15, disturbances=Disturbances(5, n_sites, record=True))
+        fleet.scenario_flags['peak_load'][:4] = True
+        SimulatedClock(fleet, dt=1.0, secondary_period=5.0, tertiary_period=60.0).advance(duration=300)
+        tape = fleet.disturbances.tape
+        for site in range(n_sites):
+            engine = MicrogridEngine(battery_soc=15, disturbances=Disturbances.from_tape(tape[:, :, site]))
+            engine.scenario_flags['peak_load'] = site < 4
+            SimulatedClock(engine, dt=1.0, secondary_period=5.0, tertiary_period=60.0).advance(duration=300)
+            for name, value in engine.snapshot().items():
+                self.assertAlmostEqual(value, fleet.snapshot(site)[name], places=9, msg=name)
+
+
+if __name__ == '__main__':
+    unittest.main()
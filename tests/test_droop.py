@@ -0,0 +1,92 @@
+import importlib.util
+import unittest
+
+import numpy as np
+
+from droop import InverterGroup, share
+from fleet_engine import FleetEngine
+from microgrid_engine import FREQ_RANGE, VOLTAGE_RANGE
+
+HAVE_SCIPY = importlib.util.find_spec('scipy') is not None
+
+
+def random_case(rng, n_units):
+    offset = rng.normal(0.0, 1.0, n_units)
+    gain = rng.uniform(0.1, 3.0, n_units)
+    low = -rng.uniform(0.0, 2.0, n_units)
+    high = rng.uniform(0.0, 2.0, n_units)
+    demand = rng.uniform(low.sum() - 0.5, high.sum() + 0.5)
+    return demand, offset, gain, low, high
+
+
+class ShareTest(unittest.TestCase):
+
+    def test_unit_pinned_in_an_early_round_is_released(self):
+        shares, _ = share(0.7, offset=[-0.9, 1.0], gain=[0.7, 1.6], low=[-0.7, -0.7], high=[1.4, 0.6])
+        np.testing.assert_allclose(shares, [0.1, 0.6])
+
+    def test_demand_beyond_limits_pins_every_unit(self):
+        shares, shift = share(5.0, offset=[0.0, 0.0], gain=[1.0, 2.0], low=[-1.0, -1.0], high=[1.0, 1.0])
+        np.testing.assert_array_equal(shares, [1.0, 1.0])
+        self.assertEqual(shift, np.inf)
+        shares, shift = share(-5.0, offset=[0.0, 0.0], gain=[1.0, 2.0], low=[-1.0, -1.0], high=[1.0, 1.0])
+        np.testing.assert_array_equal(shares, [-1.0, -1.0])
+        self.assertEqual(shift, -np.inf)
+
+    @unittest.skipUnless(HAVE_SCIPY, "needs scipy")
+    def test_matches_root_finder(self):
+        from scipy.optimize import brentq
+
+        rng = np.random.default_rng(0)
+        for _ in range(2000):
+            demand, offset, gain, low, high = random_case(rng, rng.integers(1, 8))
+            shares, _ = share(demand, offset, gain, low, high)
+            if low.sum() < demand < high.sum():
+                root = brentq(lambda shift: np.clip(offset + gain * shift, low, high).sum() - demand,
+                              -1e6, 1e6, xtol=1e-14)
+                expected = np.clip(offset + gain * root, low, high)
+            else:
+                expected = low if demand <= low.sum() else high
+            np.testing.assert_allclose(shares, expected, atol=1e-8)
+
+    def test_batch_matches_single_solves(self):
+        rng = np.random.default_rng(1)
+        cases = [random_case(rng, 5) for _ in range(200)]
+        shares, shift = share(*(np.array(column) for column in zip(*cases)))
+        for i, case in enumerate(cases):
+            expected_shares, expected_shift = share(*case)
+            np.testing.assert_allclose(shares[i], expected_shares, atol=1e-12)
+            np.testing.assert_allclose(shift[i], expected_shift)
+
+
+class InverterGroupTest(unittest.TestCase):
+
+    def test_shares_meet_demand(self):
+        group = InverterGroup.random(20, n_sites=50, seed=0)
+        p_demand = np.linspace(-9.0, 9.0, 50)
+        q_demand = np.linspace(-2.0, 2.0, 50)
+        group.share_load(p_demand, q_demand)
+        np.testing.assert_allclose(group.p.sum(axis=-1), p_demand, atol=1e-9)
+        np.testing.assert_allclose(group.q.sum(axis=-1), q_demand, atol=1e-9)
+        self.assertTrue(np.all(group.p ** 2 + group.q ** 2 <= group.rating_kva ** 2 + 1e-9))
+
+    def test_demand_beyond_every_limit_saturates_and_is_flagged(self):
+        group = InverterGroup.random(5, total_kva=2.0, n_sites=3, seed=0)
+        frequency, voltage = group.share_load([1.0, 5.0, -5.0], [0.2, 5.0, -5.0])
+        np.testing.assert_array_equal(group.overloaded, [False, True, True])
+        self.assertTrue(np.all(np.isfinite(frequency)) and np.all(np.isfinite(voltage)))
+        np.testing.assert_array_equal(frequency[1:], [FREQ_RANGE[0], FREQ_RANGE[1]])
+        np.testing.assert_array_equal(voltage[1:], [VOLTAGE_RANGE[0], VOLTAGE_RANGE[1]])
+
+    def test_under_supplied_island_runs_low(self):
+        fleet = FleetEngine(4, seed=0, inverters=InverterGroup.random(5, total_kva=2.0, n_sites=4, seed=0))
+        for scenario in ('grid_blackout', 'peak_load', 'battery_disconnect'):
+            fleet.scenario_flags[scenario][:] = True
+        for _ in range(20):
+            fleet.step(1.0)
+        self.assertTrue(fleet.inverters.overloaded.all())
+        self.assertTrue(np.all(fleet.frequency < 50.0) and np.all(fleet.voltage < 230.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from history import CHANNELS, THREE_PHASE_CHANNELS, HistoryBuffer, MemmapHistory
+
+START = np.datetime64('2024-01-01T00:00:00', 'us')
+
+
+def append(history, i):
+    history.append(START + np.timedelta64(i, 's'), {name: float(i) for name in CHANNELS})
+
+
+class HistoryBufferTest(unittest.TestCase):
+
+    def test_view_is_chronological_after_wrapping(self):
+        history = HistoryBuffer(4)
+        for i in range(10):
+            append(history, i)
+        np.testing.assert_array_equal(history['voltage'], [6, 7, 8, 9])
+
+    def test_resize_keeps_newest_records(self):
+        history = HistoryBuffer(4)
+        for i in range(10):
+            append(history, i)
+        history.resize(2)
+        np.testing.assert_array_equal(history['voltage'], [8, 9])
+
+    def test_resize_adds_and_drops_channels(self):
+        history = HistoryBuffer(4)
+        for i in range(3):
+            append(history, i)
+        history.resize(4, CHANNELS + THREE_PHASE_CHANNELS)
+        history.append(START, {name: 3.0 for name in CHANNELS + THREE_PHASE_CHANNELS})
+        np.testing.assert_array_equal(history['voltage'], [0, 1, 2, 3])
+        np.testing.assert_array_equal(history['neutral_current'], [np.nan, np.nan, np.nan, 3])
+        history.resize(4, CHANNELS)
+        self.assertEqual(history.view().dtype.names, ('time',) + CHANNELS)
+        np.testing.assert_array_equal(history['voltage'], [0, 1, 2, 3])
+
+
+class MemmapHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, 'history.mmap')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_reader_view_survives_the_next_append(self):
+        writer = MemmapHistory(self.path, capacity=4)
+        for i in range(6):
+            append(writer, i)
+        reader = MemmapHistory(self.path, readonly=True)
+        view = reader.view()
+        np.testing.assert_array_equal(view['voltage'], [2, 3, 4, 5])
+
+        append(writer, 6)
+        np.testing.assert_array_equal(view['voltage'], [2, 3, 4, 5])
+        self.assertTrue(np.all(np.diff(view['time']) > np.timedelta64(0, 'us')))
+        np.testing.assert_array_equal(reader.view()['voltage'], [3, 4, 5, 6])
+
+    def test_copy_is_chronological_at_every_wrap_position(self):
+        writer = MemmapHistory(self.path, capacity=3)
+        reader = MemmapHistory(self.path, readonly=True)
+        for i in range(12):
+            append(writer, i)
+            records = reader.copy()
+            np.testing.assert_array_equal(records['voltage'], np.arange(max(0, i - 2), i + 1))
+
+    def test_copy_drops_records_overwritten_while_copying(self):
+        writer = MemmapHistory(self.path, capacity=16)
+        for i in range(40):
+            append(writer, i)
+
+        class RacingReader(MemmapHistory):
+            # The writer appends between taking the window and copying it
+            def _window(self, count):
+                window = super()._window(count)
+                for i in range(40, 40 + racing_appends):
+                    append(writer, i)
+                return window
+
+        # 16 records and 3 spare slots: a count read after n appends also
+        # allows for append n + 1 being mid-write
+        for racing_appends, kept in ((0, 16), (3, 15), (8, 10), (30, 0)):
+            records = RacingReader(self.path, readonly=True).copy()
+            self.assertEqual(len(records), kept)
+            np.testing.assert_array_equal(records['voltage'], np.arange(40 - kept, 40))
+            np.testing.assert_array_equal(records['time'], START + np.arange(40 - kept, 40).astype('timedelta64[s]'))
+            writer.clear()
+            for i in range(40):
+                append(writer, i)
+
+    def test_resize_to_new_channels_is_kept_on_reopen(self):
+        writer = MemmapHistory(self.path, capacity=4)
+        for i in range(6):
+            append(writer, i)
+        writer.resize(4, CHANNELS + THREE_PHASE_CHANNELS)
+        reopened = MemmapHistory(self.path, readonly=True)
+        self.assertEqual(reopened.channels, CHANNELS + THREE_PHASE_CHANNELS)
+        np.testing.assert_array_equal(reopened['voltage'], [2, 3, 4, 5])
+        self.assertTrue(np.all(np.isnan(reopened['voltage_unbalance'])))
+
+    def test_reopen_resumes(self):
+        writer = MemmapHistory(self.path, capacity=4)
+        for i in range(7):
+            append(writer, i)
+        writer.flush()
+        reopened = MemmapHistory(self.path)
+        append(reopened, 7)
+        np.testing.assert_array_equal(reopened['voltage'], [4, 5, 6, 7])
+
+
+if __name__ == '__main__':
+    unittest.main()
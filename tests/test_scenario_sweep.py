@@ -0,0 +1,28 @@
+import unittest
+
+from scenario_sweep import run_seed
+
+
+class GridEnergyTest(unittest.TestCase):
+
+    def test_pv_drop_draws_from_the_grid(self):
+        # Battery at 2 kW cannot cover a 70% PV drop; the rest is imported
+        result, = run_seed(0, [{'pv_drop': True, 'island_mode': False}], duration=3600, dt=1.0)
+        self.assertGreater(result['grid_import_kwh'], 0.1)
+        self.assertEqual(result['grid_export_kwh'], 0.0)
+
+    def test_islanded_site_exchanges_nothing(self):
+        result, = run_seed(0, [{'pv_drop': True, 'island_mode': True}], duration=600, dt=1.0)
+        self.assertEqual(result['grid_import_kwh'], 0.0)
+        self.assertEqual(result['grid_export_kwh'], 0.0)
+
+    def test_tertiary_control_imports_more_at_low_soc(self):
+        # The rule-based tertiary loop buys grid energy once SoC drops below 20%
+        without, with_tertiary = run_seed(0, [
+            {'pv_drop': True, 'island_mode': False, 'tertiary_ai_enabled': enabled} for enabled in (False, True)
+        ], duration=4 * 3600, dt=1.0)
+        self.assertGreater(with_tertiary['grid_import_kwh'], without['grid_import_kwh'] + 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import datetime
+import time
+import unittest
+
+import numpy as np
+
+from controllers import Controller
+from history import HistoryBuffer
+from microgrid_engine import MicrogridEngine
+from simulation_runner import SimulationRunner
+
+
+class FailingSecondary(Controller):
+
+    def observe(self, state):
+        raise RuntimeError("controller failed")
+
+
+class TimestampTest(unittest.TestCase):
+
+    def test_timestamps_stay_monotonic_across_clock_modes(self):
+        runner = SimulationRunner(MicrogridEngine(seed=0), HistoryBuffer(1000000), period=0.05)
+        try:
+            runner.submit('dt', 0.01).wait(1.0)
+            runner.submit('running', True).wait(1.0)
+            time.sleep(0.5)
+            runner.submit('simulated', True).wait(1.0)
+            time.sleep(0.3)
+            runner.submit('simulated', False).wait(1.0)
+            time.sleep(0.5)
+            runner.submit('running', False).wait(1.0)
+        finally:
+            runner.stop()
+        # Switching clock mode clears history; the last real-time run is left
+        times = runner.history_view()['time']
+        self.assertGreater(len(times), 20)
+        self.assertTrue(np.all(np.diff(times) > np.timedelta64(0, 'us')))
+
+    def test_real_time_after_a_simulated_run_is_stamped_in_wall_time(self):
+        runner = SimulationRunner(MicrogridEngine(seed=0), HistoryBuffer(1000000), period=0.05)
+        try:
+            runner.submit('dt', 0.1).wait(1.0)
+            runner.submit('simulated', True).wait(1.0)
+            runner.submit('running', True).wait(1.0)
+            time.sleep(0.3)
+            now = np.datetime64(datetime.datetime.now(), 'us')
+            self.assertGreater(runner.history_view()['time'][-1], now + np.timedelta64(10, 'm'))
+            runner.submit('simulated', False).wait(1.0)
+            time.sleep(0.5)
+            runner.submit('running', False).wait(1.0)
+        finally:
+            runner.stop()
+        times = runner.history_view()['time']
+        self.assertGreater(len(times), 1)
+        # Only real-time samples, none after now
+        self.assertLess(times[-1], np.datetime64(datetime.datetime.now(), 'us'))
+        self.assertGreater(times[0], np.datetime64(datetime.datetime.now(), 'us') - np.timedelta64(2, 's'))
+
+    def test_restored_simulated_history_is_dropped(self):
+        history = HistoryBuffer(100)
+        ahead = np.datetime64(datetime.datetime.now(), 'us') + np.timedelta64(1, 'h')
+        history.append(ahead, MicrogridEngine(seed=0).snapshot())
+        runner = SimulationRunner(MicrogridEngine(seed=0), history, period=0.05)
+        try:
+            self.assertEqual(len(history), 0)
+            runner.submit('dt', 0.1).wait(1.0)
+            runner.submit('running', True).wait(1.0)
+            time.sleep(0.3)
+        finally:
+            runner.stop()
+        times = runner.history_view()['time']
+        self.assertGreater(len(times), 1)
+        self.assertLess(times[-1], np.datetime64(datetime.datetime.now(), 'us'))
+        self.assertTrue(np.all(np.diff(times) > np.timedelta64(0, 'us')))
+
+class ThreePhaseChannelTest(unittest.TestCase):
+
+    def test_three_phase_channels_are_recorded_while_the_model_is_on(self):
+        runner = SimulationRunner(MicrogridEngine(seed=0), HistoryBuffer(1000), period=0.05)
+        try:
+            runner.submit('dt', 0.1).wait(1.0)
+            runner.submit('three_phase', True).wait(1.0)
+            runner.submit('running', True).wait(1.0)
+            time.sleep(0.3)
+            records = runner.history_view()
+            self.assertGreater(len(records), 1)
+            self.assertTrue(np.all(records['voltage_unbalance'] > 0))
+            self.assertTrue(np.all(records['neutral_current'] > 0))
+
+            runner.submit('three_phase', False).wait(1.0)
+            self.assertNotIn('voltage_unbalance', runner.history_view().dtype.names)
+        finally:
+            runner.stop()
+
+
+class WorkerErrorTest(unittest.TestCase):
+
+    def test_failed_command_is_reported_and_the_worker_carries_on(self):
+        runner = SimulationRunner(MicrogridEngine(seed=0), HistoryBuffer(100), period=0.05)
+        try:
+            done = runner.submit('secondary_controller', 'nope')
+            self.assertTrue(done.wait(1.0))
+            self.assertIsInstance(done.error, KeyError)
+            self.assertTrue(runner._thread.is_alive())
+            done = runner.submit('dt', 0.1)
+            self.assertTrue(done.wait(1.0))
+            self.assertIsNone(done.error)
+        finally:
+            runner.stop()
+
+    def test_failed_tick_stops_the_simulation_and_keeps_the_worker(self):
+        engine = MicrogridEngine(seed=0, secondary_controller=FailingSecondary())
+        runner = SimulationRunner(engine, HistoryBuffer(100), period=0.05)
+        try:
+            runner.submit('dt', 0.1).wait(1.0)
+            runner.submit('running', True).wait(1.0)
+            time.sleep(0.2)
+            self.assertFalse(runner.running)
+            self.assertIn("controller failed", runner.error)
+            self.assertTrue(runner._thread.is_alive())
+
+            runner.submit('secondary_controller', 'proportional').wait(1.0)
+            runner.submit('running', True).wait(1.0)
+            self.assertIsNone(runner.error)
+            time.sleep(0.2)
+            self.assertTrue(runner.running)
+            self.assertGreater(len(runner.history), 0)
+        finally:
+            runner.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from history import CHANNELS, THREE_PHASE_CHANNELS, HistoryBuffer
+from microgrid_engine import MicrogridEngine
+from simulation_runner import SimulationRunner
+from telemetry_store import HAVE_PYARROW, TelemetryStore
+
+
+def values(i):
+    return {name: float(i) for name in CHANNELS}
+
+
+@unittest.skipUnless(HAVE_PYARROW, "needs pyarrow")
+class TelemetryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_read_while_recording(self):
+        store = TelemetryStore(self.root, flush_period=10)
+        start = np.datetime64('2024-01-01T23:59:40', 'us')
+        for i in range(35):  # Crosses midnight, leaves 5 rows staged
+            store.append(start + np.timedelta64(i, 's'), values(i))
+        frame = TelemetryStore(self.root).read()
+        self.assertEqual(len(frame), 30)
+        np.testing.assert_array_equal(frame['voltage'], np.arange(30))
+
+        store.close()
+        self.assertEqual(len(TelemetryStore(self.root).read()), 35)
+
+    def test_fast_records_are_batched_into_row_groups(self):
+        import pyarrow.parquet as pq
+
+        start = np.datetime64('2024-01-01T00:00:00', 'us')
+        # 1 ms steps for 60 s: six 10 s files, or 4000-row files under the staged row limit
+        for max_rows, n_files in ((100000, 6), (4000, 15)):
+            root = os.path.join(self.root, str(max_rows))
+            store = TelemetryStore(root, row_group_size=1000, flush_period=10, max_rows=max_rows)
+            for i in range(60000):
+                store.append(start + np.timedelta64(i, 'ms'), values(i))
+            store.close()
+            directory = os.path.join(root, 'date=2024-01-01')
+            files = os.listdir(directory)
+            self.assertEqual(len(files), n_files)
+            self.assertEqual(sum(pq.ParquetFile(os.path.join(directory, name)).metadata.num_row_groups
+                                 for name in files), 60)
+            frame = TelemetryStore(root).read()
+            np.testing.assert_array_equal(frame['voltage'], np.arange(60000, dtype=np.float32))
+
+    def test_interrupted_write_leaves_store_readable(self):
+        store = TelemetryStore(self.root)
+        start = np.datetime64('2024-01-01T00:00:00', 'us')
+        for i in range(10):
+            store.append(start + np.timedelta64(i, 's'), values(i))
+        store.flush()
+        # A writer killed mid-file leaves only a dot-named partial file behind
+        with open(os.path.join(self.root, 'date=2024-01-01', '.part-partial.parquet'), 'wb') as f:
+            f.write(b'PAR1 truncated')
+        self.assertEqual(len(TelemetryStore(self.root).read()), 10)
+
+    def test_runner_stop_writes_staged_rows(self):
+        runner = SimulationRunner(MicrogridEngine(seed=0), HistoryBuffer(100000), period=0.01)
+        runner.submit('dt', 0.01).wait(1.0)
+        runner.submit('telemetry', self.root).wait(1.0)
+        runner.submit('running', True).wait(1.0)
+        deadline = time.time() + 5.0
+        while len(runner.history) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(TelemetryStore(self.root).read()), 0)  # Still staged, and readable
+
+        runner.stop()
+        self.assertIsNone(runner.store)
+        self.assertEqual(len(TelemetryStore(self.root).read()), len(runner.history))
+
+    def test_runner_records_only_real_time(self):
+        runner = SimulationRunner(MicrogridEngine(seed=0), HistoryBuffer(100000), period=0.01)
+        runner.submit('dt', 0.1).wait(1.0)
+        runner.submit('telemetry', self.root).wait(1.0)
+        runner.submit('simulated', True).wait(1.0)
+        runner.submit('running', True).wait(1.0)
+        time.sleep(0.2)
+        runner.stop()
+        self.assertGreater(len(runner.history), 0)
+        self.assertEqual(len(TelemetryStore(self.root).read()), 0)
+
+    def test_runner_records_three_phase_channels(self):
+        runner = SimulationRunner(MicrogridEngine(seed=0), HistoryBuffer(100000), period=0.01)
+        runner.submit('dt', 0.1).wait(1.0)
+        runner.submit('telemetry', self.root).wait(1.0)
+        runner.submit('three_phase', True).wait(1.0)
+        runner.submit('running', True).wait(1.0)
+        time.sleep(0.2)
+        runner.stop()
+        frame = TelemetryStore(self.root, CHANNELS + THREE_PHASE_CHANNELS).read()
+        self.assertEqual(len(frame), len(runner.history))
+        self.assertTrue((frame['neutral_current'] > 0).all())
+        # Readers of the base channels are unaffected
+        self.assertEqual(list(TelemetryStore(self.root).read().columns), ['time'] + list(CHANNELS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import numpy as np
+
+from microgrid_engine import REACTIVE_LOAD_RATIO
+
+# Phase rotation operator and the phasors of a balanced a-b-c set
+A = np.exp(2j * np.pi / 3)
+PHASES = np.array([1.0, A ** 2, A])
+SQRT3_2 = np.sqrt(3) / 2
+
+# Fixed-point sweeps of the constant-power load currents; within 0.01 V at LV loading
+SWEEPS = 2
+
+
+class ThreePhaseModel:
+    """Four-wire three-phase supply feeding single-phase loads and PV spread unevenly over the phases.
+
+    Shares are (..., 3) fractions of the site's load and PV on phases a, b
+    and c; `(3,)` for one site, `(n_sites, 3)` for a fleet. Each phase reaches
+    the loads through `z_phase` and the currents return through `z_neutral`,
+    so an uneven split shifts the load neutral and unbalances the phase
+    voltages. The phasor arithmetic runs on real and imaginary float arrays
+    in preallocated buffers: NumPy's complex kernels with scalar or broadcast
+    operands, and fresh fleet-sized temporaries every step, each cost more
+    than the arithmetic itself.
+    """
+
+    def __init__(self, load_shares, pv_shares=None, z_phase=0.2 + 0.1j, z_neutral=0.2 + 0.1j):
+        self.load_shares = np.asarray(load_shares, dtype=float)
+        self.pv_shares = self.load_shares if pv_shares is None else np.asarray(pv_shares, dtype=float)
+        self.z_phase = complex(z_phase)
+        self.z_neutral = complex(z_neutral)
+        # Phase-major copies: each phase is one contiguous row, so per-phase
+        # arithmetic runs over long rows instead of length-3 ones
+        self._load_shares = np.ascontiguousarray(np.moveaxis(self.load_shares, -1, 0))
+        self._pv_shares = np.ascontiguousarray(np.moveaxis(self.pv_shares, -1, 0))
+        self._phase = [np.empty(self._load_shares.shape) for _ in range(11)]
+        self._site = [np.empty(self._load_shares.shape[1:]) for _ in range(3)]
+        # Outputs of the last solve(), (..., 3) like the shares
+        self.phase_voltage = None
+        self.phase_current = None
+        self.phase_load = None
+        self.voltage_unbalance = None
+        self.neutral_current = None
+
+    @classmethod
+    def random(cls, n_sites=None, imbalance=0.4, seed=None):
+        # Shares within +/-imbalance of an even split, separately for load and PV
+        rng = np.random.default_rng(seed)
+        shape = (3,) if n_sites is None else (n_sites, 3)
+        shares = 1.0 + imbalance * rng.uniform(-1.0, 1.0, (2,) + shape)
+        shares /= shares.sum(axis=-1, keepdims=True)
+        return cls(shares[0], shares[1])
+
+    def solve(self, load_kw, pv_kw, voltage):
+        # Per-phase state for site totals (kW) and the source phase voltage (V)
+        phase_load, p, q, source_re, source_im, v_re, v_im, i_re, i_im, magnitude, tmp = self._phase
+        n_re, n_im, site_tmp = self._site
+
+        np.multiply(load_kw, self._load_shares, out=phase_load)
+        # Complex power drawn on each phase (W, var)
+        np.multiply(pv_kw, self._pv_shares, out=p)
+        np.subtract(phase_load, p, out=p)
+        p *= 1000
+        np.multiply(phase_load, REACTIVE_LOAD_RATIO * 1000, out=q)
+        np.multiply.outer(PHASES.real, voltage, out=source_re)
+        np.multiply.outer(PHASES.imag, voltage, out=source_im)
+
+        zp_re, zp_im = self.z_phase.real, self.z_phase.imag
+        zn_re, zn_im = self.z_neutral.real, self.z_neutral.imag
+        np.copyto(v_re, source_re)
+        np.copyto(v_im, source_im)
+        for _ in range(SWEEPS):
+            # I = conj(S / V) = conj(S) V / |V|^2
+            np.multiply(v_re, v_re, out=magnitude)
+            magnitude += np.multiply(v_im, v_im, out=tmp)
+            np.multiply(p, v_re, out=i_re)
+            i_re += np.multiply(q, v_im, out=tmp)
+            i_re /= magnitude
+            np.multiply(p, v_im, out=i_im)
+            i_im -= np.multiply(q, v_re, out=tmp)
+            i_im /= magnitude
+            # Neutral return current, the sum unrolled over the phases
+            np.add(i_re[0], i_re[1], out=n_re)
+            n_re += i_re[2]
+            np.add(i_im[0], i_im[1], out=n_im)
+            n_im += i_im[2]
+
+            # V = source - z_phase I - z_neutral I_n
+            np.subtract(source_re, np.multiply(zp_re, i_re, out=tmp), out=v_re)
+            v_re += np.multiply(zp_im, i_im, out=tmp)
+            v_re -= np.multiply(zn_re, n_re, out=site_tmp)
+            v_re += np.multiply(zn_im, n_im, out=site_tmp)
+            np.subtract(source_im, np.multiply(zp_re, i_im, out=tmp), out=v_im)
+            v_im -= np.multiply(zp_im, i_re, out=tmp)
+            v_im -= np.multiply(zn_re, n_im, out=site_tmp)
+            v_im -= np.multiply(zn_im, n_re, out=site_tmp)
+
+        # Voltage unbalance factor |V2| / |V1|, the sequence components
+        # V1,2 = (Va + a^(1,2) Vb + a^(2,1) Vc) / 3 split into common and
+        # rotating parts (the /3 cancels)
+        common_re = v_re[0] - 0.5 * (v_re[1] + v_re[2])
+        common_im = v_im[0] - 0.5 * (v_im[1] + v_im[2])
+        rotating_re = SQRT3_2 * (v_im[1] - v_im[2])
+        rotating_im = SQRT3_2 * (v_re[1] - v_re[2])
+        positive = (common_re - rotating_re) ** 2 + (common_im + rotating_im) ** 2
+        negative = (common_re + rotating_re) ** 2 + (common_im - rotating_im) ** 2
+        self.voltage_unbalance = 100 * np.sqrt(negative / positive)
+
+        # Magnitudes as sqrt(re^2 + im^2); np.hypot and complex abs are an order slower
+        np.multiply(v_re, v_re, out=magnitude)
+        magnitude += np.multiply(v_im, v_im, out=tmp)
+        self.phase_voltage = np.moveaxis(np.sqrt(magnitude), 0, -1)
+        np.multiply(i_re, i_re, out=magnitude)
+        magnitude += np.multiply(i_im, i_im, out=tmp)
+        self.phase_current = np.moveaxis(np.sqrt(magnitude), 0, -1)
+        self.phase_load = np.moveaxis(phase_load.copy(), 0, -1)
+        self.neutral_current = np.sqrt(n_re * n_re + n_im * n_im)
+        return self